@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class CircuitOpen(Exception):
+	"""
+	Exception raised when a request is refused because the upstream API is considered down.
+	"""
+
+
+class CircuitBreaker:
+	"""
+	Class to stop calling an upstream API while it is failing, and to probe it before calling it again.
+	"""
+
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half_open"
+
+	def __init__(
+			self,
+			name: str,
+			failure_rate: float = 0.5,
+			min_calls: int = 10,
+			window: float = 30.0,
+			open_seconds: float = 30.0
+		) -> None:
+		"""
+		Constructor to initialize the circuit in the closed state.
+
+		Args:
+			name (str): The name of the upstream API.
+			failure_rate (float): The share of failed calls in the window above which the circuit opens.
+			min_calls (int): The number of calls in the window below which the circuit never opens.
+			window (float): The number of seconds of calls the failure rate is computed on.
+			open_seconds (float): The number of seconds the circuit stays open before a probe call is let through.
+		"""
+
+		self.name = name
+		self.failure_rate = failure_rate
+		self.min_calls = min_calls
+		self.window = window
+		self.open_seconds = open_seconds
+		self.state = self.CLOSED
+		self.opened_at = 0.0
+		self.probing = False
+		self.outcomes = deque()
+		self.lock = threading.Lock()
+
+	def allow(self) -> None:
+		"""
+		Method to check whether a call can be made.
+
+		Raises:
+			CircuitOpen: If the circuit is open, or half open with its probe call already running.
+		"""
+
+		with self.lock:
+			if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+				self.state = self.HALF_OPEN
+
+			if self.state == self.CLOSED:
+				return
+
+			# Only a single probe call is let through while half open
+			if self.state == self.HALF_OPEN and not self.probing:
+				self.probing = True
+				return
+
+		raise CircuitOpen(f"The {self.name} API is unavailable, the request was not sent.")
+
+	def record_success(self) -> None:
+		"""
+		Method to record a successful call, closing the circuit if it was the probe call.
+		"""
+
+		with self.lock:
+			if self.state == self.HALF_OPEN:
+				self.state = self.CLOSED
+				self.probing = False
+				self.outcomes.clear()
+				return
+
+			self.record(True)
+
+	def record_failure(self) -> None:
+		"""
+		Method to record a failed call (connection error, timeout or 5xx), opening the circuit if too many calls failed.
+		"""
+
+		with self.lock:
+			if self.state == self.HALF_OPEN:
+				self.open()
+				return
+
+			self.record(False)
+
+			failures = sum(1 for _, success in self.outcomes if not success)
+			if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+				self.open()
+
+	def release(self) -> None:
+		"""
+		Method to give back a call allowed but not made (e.g. refused by the rate limiter), so that the probe can be sent by another caller.
+		"""
+
+		with self.lock:
+			if self.state == self.HALF_OPEN:
+				self.probing = False
+
+	def record(self, success: bool) -> None:
+		"""
+		Method to add an outcome to the window, dropping the outcomes older than the window. Called with the lock held.
+
+		Args:
+			success (bool): Whether the call succeeded.
+		"""
+
+		now = time.monotonic()
+		self.outcomes.append((now, success))
+
+		while self.outcomes and now - self.outcomes[0][0] > self.window:
+			self.outcomes.popleft()
+
+	def open(self) -> None:
+		"""
+		Method to open the circuit. Called with the lock held.
+		"""
+
+		self.state = self.OPEN
+		self.opened_at = time.monotonic()
+		self.probing = False
+		self.outcomes.clear()
+
+
+# Instantiate the circuit breakers shared by all the requests, one per upstream API
+facebook_circuit_breaker = CircuitBreaker(
+	"Facebook",
+	failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5)),
+	min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", 10)),
+	window=float(os.getenv("CIRCUIT_WINDOW", 30)),
+	open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+)
+tiktok_circuit_breaker = CircuitBreaker(
+	"TikTok",
+	failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5)),
+	min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", 10)),
+	window=float(os.getenv("CIRCUIT_WINDOW", 30)),
+	open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+)
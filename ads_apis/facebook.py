@@ -1,11 +1,17 @@
 import os
+import urllib.parse
+from concurrent.futures import wait
+from typing import Iterator
 
 import requests
+from .circuit_breaker import CircuitBreaker, CircuitOpen, facebook_circuit_breaker
 from .countries import CountryCodes
+from .graph_batch import GraphBatcher, graph_batcher
+from .http_client import HttpClient, http_client
+from .rate_limiter import RateLimiter, RateLimitExceeded, facebook_rate_limiter
+from .response_archive import ResponseArchive, response_archive
 from dotenv import load_dotenv
 
-import json
-
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
@@ -15,11 +21,30 @@ class FacebookAPI:
 	Class to interact with the Facebook Ads API.
 	"""
 
-	def __init__(self) -> None:
+	def __init__(
+			self,
+			http_client: HttpClient = http_client,
+			archive: ResponseArchive = response_archive,
+			rate_limiter: RateLimiter = facebook_rate_limiter,
+			circuit_breaker: CircuitBreaker = facebook_circuit_breaker,
+			batcher: GraphBatcher = graph_batcher
+		) -> None:
 		"""
 		Constructor to initialize the access key and the Facebook ads api endpoint.
+
+		Args:
+			http_client (HttpClient): The pooled HTTP client used to reach the API.
+			archive (ResponseArchive): The background archive of the raw responses.
+			rate_limiter (RateLimiter): The limiter pacing the requests to the Graph API.
+			circuit_breaker (CircuitBreaker): The breaker failing fast while the Graph API is down.
+			batcher (GraphBatcher): The batcher grouping the per-ad lookups into batch requests.
 		"""
 
+		self.batcher = batcher
+		self.http_client = http_client
+		self.archive = archive
+		self.rate_limiter = rate_limiter
+		self.circuit_breaker = circuit_breaker
 		self.access_key = None
 		self.ads_api_endpoint = "https://graph.facebook.com/v19.0/ads_archive"
 
@@ -35,13 +60,25 @@ class FacebookAPI:
 
 		return self.access_key
 
-	def get_ads(self, search_term: str, country: str = CountryCodes.US) -> dict:
+	def get_ads(
+			self,
+			search_term: str,
+			country: str = CountryCodes.US,
+			after: str | None = None,
+			limit: int | None = None,
+			delivery_date_min: str | None = None,
+			fields: str | None = None
+		) -> dict:
 		"""
 		Method to get the ads from the Facebook Ads API.
 
 		Args:
 			search_term (str): The search term.
 			country (str): The country.
+			after (str): The cursor of the page to get (default is the first page).
+			limit (int): The number of ads per page (default is the API default).
+			delivery_date_min (str): The YYYY-mm-dd date the ads must have been delivered since (default is any date).
+			fields (str): The comma separated fields of the ads to return (default is the API default fields).
 
 		Returns:
 			dict: The JSON response from the API endpoint (containing the ads data).
@@ -54,17 +91,150 @@ class FacebookAPI:
 		params = {
 			"ad_reached_countries": [country],
 			"search_terms": search_term,
-			# "limit": 1,
 			"access_token": token_key
 		}
 
-		response = requests.get(self.ads_api_endpoint, params=params)
+		if after is not None:
+			params["after"] = after
+
+		if limit is not None:
+			params["limit"] = limit
+
+		if delivery_date_min is not None:
+			params["ad_delivery_date_min"] = delivery_date_min
+
+		if fields is not None:
+			params["fields"] = fields
+
+		# Fail fast instead of holding a worker while the Graph API is down
+		try:
+			self.circuit_breaker.allow()
+		except CircuitOpen as e:
+			return {
+				"error": "The Facebook API is unavailable.",
+				"details": str(e)
+			}
+
+		# Wait for our turn, the Graph API locks the whole app out when it is overused
+		try:
+			self.rate_limiter.acquire()
+		except RateLimitExceeded as e:
+			self.circuit_breaker.release()
+			return {
+				"error": "The Facebook API rate limit is reached.",
+				"details": str(e)
+			}
+
+		try:
+			response = self.http_client.get(self.ads_api_endpoint, params=params)
+		except requests.exceptions.RequestException as e:
+			self.circuit_breaker.record_failure()
+			return {
+				"error": "An error occurred while making the request.",
+				"details": str(e)
+			}
+
+		if response.status_code >= 500:
+			self.circuit_breaker.record_failure()
+		else:
+			self.circuit_breaker.record_success()
+
+		self.rate_limiter.observe(response)
 
 		store_resp = response.json()
 
-		with open('fb_ads.json', 'w') as f:
-			json.dump(store_resp, f)
+		# Archived by a background writer, if enabled
+		self.archive.submit("facebook", store_resp)
 
 		return store_resp
 
+	def get_objects(self, object_ids: list[str], fields: str, timeout: float = 10.0) -> dict:
+		"""
+		Method to get Graph API objects (e.g. ads, creatives or pages) by id, batched with the lookups of the other callers.
+
+		Args:
+			object_ids (list[str]): The ids of the objects.
+			fields (str): The comma separated fields of the objects to return.
+			timeout (float): The number of seconds to wait for all the objects.
+
+		Returns:
+			dict: The JSON object (or error) of each id.
+		"""
+
+		# Queue every lookup before waiting, so that they all go in the same batches
+		futures = {
+			object_id: self.batcher.submit(f"{object_id}?{urllib.parse.urlencode({'fields': fields})}")
+			for object_id in dict.fromkeys(object_ids)
+		}
+
+		wait(futures.values(), timeout=timeout)
+
+		return {
+			object_id: future.result() if future.done() else {"error": "The Facebook batch request timed out."}
+			for object_id, future in futures.items()
+		}
+
+	def get_object(self, object_id: str, fields: str) -> dict:
+		"""
+		Method to get a single Graph API object by id, batched with the lookups of the other callers.
+
+		Args:
+			object_id (str): The id of the object.
+			fields (str): The comma separated fields of the object to return.
+
+		Returns:
+			dict: The JSON object, or an "error" if the lookup failed.
+		"""
+
+		return self.get_objects([object_id], fields)[object_id]
+
+	def iter_pages(
+			self,
+			search_term: str,
+			country: str = CountryCodes.US,
+			max_ads: int = 100,
+			page_size: int = 25,
+			delivery_date_min: str | None = None,
+			fields: str | None = None
+		) -> Iterator[dict]:
+		"""
+		Method to lazily get the pages of ads, following the "after" cursor until max_ads ads have been fetched.
+
+		Args:
+			search_term (str): The search term.
+			country (str): The country.
+			max_ads (int): The maximum number of ads to fetch across all the pages.
+			page_size (int): The number of ads requested per page.
+			delivery_date_min (str): The YYYY-mm-dd date the ads must have been delivered since (default is any date).
+			fields (str): The comma separated fields of the ads to return (default is the API default fields).
+
+		Yields:
+			dict: The JSON response of each page. A response without "data" (e.g. an error) is the last one.
+		"""
+
+		after = None
+		fetched = 0
+
+		while fetched < max_ads:
+			page = self.get_ads(
+				search_term,
+				country,
+				after=after,
+				limit=min(page_size, max_ads - fetched),
+				delivery_date_min=delivery_date_min,
+				fields=fields
+			)
+			yield page
+
+			if not page or "data" not in page:
+				return
+
+			fetched += len(page["data"])
+			paging = page.get("paging", {})
+			after = paging.get("cursors", {}).get("after")
+
+			# The last page has no "next" link
+			if not page["data"] or after is None or "next" not in paging:
+				return
+
 # print(FacebookAPI().get_ads("cat", CountryCodes.US))
\ No newline at end of file
@@ -0,0 +1,215 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from dotenv import load_dotenv
+
+from .circuit_breaker import CircuitBreaker, CircuitOpen, facebook_circuit_breaker
+from .http_client import HttpClient, http_client
+from .rate_limiter import RateLimiter, RateLimitExceeded, facebook_rate_limiter
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+# The Graph API refuses batches of more than 50 requests
+MAX_BATCH_SIZE = 50
+
+
+class GraphBatcher:
+	"""
+	Class to group the single object lookups of concurrent callers into Graph API batch requests.
+	"""
+
+	def __init__(
+			self,
+			http_client: HttpClient = http_client,
+			rate_limiter: RateLimiter = facebook_rate_limiter,
+			circuit_breaker: CircuitBreaker = facebook_circuit_breaker,
+			window: float = 0.005,
+			max_batch_size: int = MAX_BATCH_SIZE
+		) -> None:
+		"""
+		Constructor to initialize the pending lookups. The dispatcher thread is started by the first lookup.
+
+		Args:
+			http_client (HttpClient): The pooled HTTP client used to reach the API.
+			rate_limiter (RateLimiter): The limiter pacing the requests to the Graph API.
+			circuit_breaker (CircuitBreaker): The breaker failing fast while the Graph API is down.
+			window (float): The number of seconds lookups are collected for after the first one.
+			max_batch_size (int): The maximum number of lookups per batch request.
+		"""
+
+		self.http_client = http_client
+		self.rate_limiter = rate_limiter
+		self.circuit_breaker = circuit_breaker
+		self.window = window
+		self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+		self.api_root = "https://graph.facebook.com/v19.0"
+		self.pending = queue.Queue()
+		self.lock = threading.Lock()
+		self.thread = None
+
+	def submit(self, relative_url: str) -> Future:
+		"""
+		Method to queue a Graph API object lookup, to be sent along with the other lookups of the moment.
+
+		Args:
+			relative_url (str): The url of the object relative to the API version (e.g. "1234?fields=name").
+
+		Returns:
+			Future: The future resolved with the JSON object, or an "error" if the lookup failed.
+		"""
+
+		with self.lock:
+			if self.thread is None:
+				self.thread = threading.Thread(target=self.run, name="graph-batcher", daemon=True)
+				self.thread.start()
+
+		future = Future()
+		self.pending.put((relative_url, future))
+
+		return future
+
+	def lookup(self, relative_url: str, timeout: float = 10.0) -> dict:
+		"""
+		Method to get a Graph API object, sent along with the other lookups of the moment.
+
+		Args:
+			relative_url (str): The url of the object relative to the API version (e.g. "1234?fields=name").
+			timeout (float): The number of seconds to wait for the batch response.
+
+		Returns:
+			dict: The JSON object, or an "error" if the lookup failed.
+		"""
+
+		try:
+			return self.submit(relative_url).result(timeout=timeout)
+		except TimeoutError:
+			return {"error": "The Facebook batch request timed out."}
+
+	def run(self) -> None:
+		"""
+		Method run by the dispatcher thread, sending a batch once the window after its first lookup is over.
+		"""
+
+		while True:
+			batch = [self.pending.get()]
+
+			# The thread serves every lookup of the process, nothing may stop it
+			try:
+				self.dispatch(batch)
+			except Exception as e:
+				self.resolve(batch, [], {"error": "An error occurred while making the request.", "details": str(e)})
+
+	def dispatch(self, batch: list[tuple]) -> None:
+		"""
+		Method to complete a batch with the lookups of the window after its first one, then send it.
+
+		Args:
+			batch (list[tuple]): The (relative url, future) of the first lookup.
+		"""
+
+		deadline = time.monotonic() + self.window
+
+		while len(batch) < self.max_batch_size:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				break
+			try:
+				batch.append(self.pending.get(timeout=remaining))
+			except queue.Empty:
+				break
+
+		try:
+			results = self.send([relative_url for relative_url, _ in batch])
+		except Exception as e:
+			results = []
+			error = {"error": "An error occurred while making the request.", "details": str(e)}
+		else:
+			error = {"error": "The lookup is missing from the Facebook batch response."}
+
+		self.resolve(batch, results, error)
+
+	def resolve(self, batch: list[tuple], results: list[dict], error: dict) -> None:
+		"""
+		Method to resolve the futures of a batch, failing the ones the response has no result for.
+
+		Args:
+			batch (list[tuple]): The (relative url, future) of each lookup.
+			results (list[dict]): The result of each lookup, in the same order (may be shorter than the batch).
+			error (dict): The result of the lookups without a result.
+		"""
+
+		for index, (_, future) in enumerate(batch):
+			if not future.done():
+				future.set_result(results[index] if index < len(results) else error)
+
+	def send(self, relative_urls: list[str]) -> list[dict]:
+		"""
+		Method to send a batch request and split its response back to each lookup.
+
+		Args:
+			relative_urls (list[str]): The relative urls of the lookups.
+
+		Returns:
+			list[dict]: The JSON object (or error) of each lookup, in the same order.
+		"""
+
+		try:
+			self.circuit_breaker.allow()
+		except CircuitOpen as e:
+			return [{"error": "The Facebook API is unavailable or its rate limit is reached.", "details": str(e)}] * len(relative_urls)
+
+		try:
+			self.rate_limiter.acquire()
+		except RateLimitExceeded as e:
+			self.circuit_breaker.release()
+			return [{"error": "The Facebook API is unavailable or its rate limit is reached.", "details": str(e)}] * len(relative_urls)
+
+		data = {
+			"access_token": os.getenv("FACEBOOK_ACCESS_KEY"),
+			"include_headers": "false",
+			"batch": json.dumps([{"method": "GET", "relative_url": relative_url} for relative_url in relative_urls])
+		}
+
+		try:
+			response = self.http_client.post(self.api_root, data=data)
+		except requests.exceptions.RequestException:
+			self.circuit_breaker.record_failure()
+			raise
+
+		if response.status_code >= 500:
+			self.circuit_breaker.record_failure()
+		else:
+			self.circuit_breaker.record_success()
+
+		self.rate_limiter.observe(response)
+
+		body = response.json()
+		if not isinstance(body, list):
+			# The whole batch was refused (e.g. invalid token)
+			return [body] * len(relative_urls)
+
+		results = []
+		for item in body:
+			# A null item is a lookup the API did not get to (the batch timed out on its side)
+			if item is None:
+				results.append({"error": "The lookup was not processed by the Facebook API."})
+				continue
+
+			try:
+				result = json.loads(item.get("body") or "{}")
+			except ValueError:
+				result = {"error": item.get("body")}
+
+			results.append(result if item.get("code") == 200 or "error" in result else {"error": result})
+
+		return results
+
+
+# Instantiate the Graph API batcher shared by all the requests
+graph_batcher = GraphBatcher(window=float(os.getenv("GRAPH_BATCH_WINDOW", 0.005)))
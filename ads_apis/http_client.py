@@ -0,0 +1,78 @@
+import os
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class HttpClient:
+	"""
+	Class to hold the keep-alive HTTP connections shared by the ads APIs.
+	"""
+
+	def __init__(
+			self,
+			pool_connections: int = 10,
+			pool_maxsize: int = 20,
+			connect_timeout: float = 3.05,
+			read_timeout: float = 10.0
+		) -> None:
+		"""
+		Constructor to initialize the pooled session and the default timeouts.
+
+		Args:
+			pool_connections (int): The number of hosts (graph.facebook.com, open.tiktokapis.com, fbcdn...) to keep a pool for.
+			pool_maxsize (int): The maximum number of connections kept alive per host.
+			connect_timeout (float): The time in seconds to wait for a connection to be established.
+			read_timeout (float): The time in seconds to wait between two bytes of the response.
+		"""
+
+		self.timeout = (connect_timeout, read_timeout)
+		self.session = requests.Session()
+
+		# Each host gets its own pool of up to pool_maxsize connections, reused across requests
+		adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+		self.session.mount("https://", adapter)
+		self.session.mount("http://", adapter)
+
+	def get(self, url: str, **kwargs) -> requests.Response:
+		"""
+		Method to send a GET request on a pooled connection.
+
+		Args:
+			url (str): The url.
+			**kwargs: The arguments of requests.get (params, headers, stream, timeout...).
+
+		Returns:
+			requests.Response: The response.
+		"""
+
+		kwargs.setdefault("timeout", self.timeout)
+		return self.session.get(url, **kwargs)
+
+	def post(self, url: str, **kwargs) -> requests.Response:
+		"""
+		Method to send a POST request on a pooled connection.
+
+		Args:
+			url (str): The url.
+			**kwargs: The arguments of requests.post (params, data, headers, timeout...).
+
+		Returns:
+			requests.Response: The response.
+		"""
+
+		kwargs.setdefault("timeout", self.timeout)
+		return self.session.post(url, **kwargs)
+
+
+# Instantiate the HTTP client shared by the whole process
+http_client = HttpClient(
+	pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", 10)),
+	pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 20)),
+	connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05)),
+	read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 10.0))
+)
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class RateLimitExceeded(Exception):
+	"""
+	Exception raised when a request would have to wait longer than allowed for the upstream rate limit.
+	"""
+
+
+class RateLimiter:
+	"""
+	Class to pace the requests to an upstream API with a token bucket, adapting its rate to the usage the API reports.
+	"""
+
+	def __init__(
+			self,
+			name: str,
+			rate: float = 5.0,
+			burst: int = 10,
+			max_wait: float = 2.0,
+			min_rate: float = 0.2
+		) -> None:
+		"""
+		Constructor to initialize the token bucket.
+
+		Args:
+			name (str): The name of the upstream API.
+			rate (float): The maximum number of requests per second.
+			burst (int): The number of requests that can be sent at once after an idle period.
+			max_wait (float): The maximum number of seconds a caller waits for its turn.
+			min_rate (float): The rate the limiter never goes below when the API asks to slow down.
+		"""
+
+		self.name = name
+		self.max_rate = rate
+		self.rate = rate
+		self.min_rate = min(min_rate, rate)
+		self.burst = burst
+		self.max_wait = max_wait
+		self.tokens = float(burst)
+		self.updated_at = time.monotonic()
+		self.blocked_until = 0.0
+		self.usage = 0.0
+		self.lock = threading.Lock()
+
+	def acquire(self) -> None:
+		"""
+		Method to wait for the turn of the caller.
+
+		Raises:
+			RateLimitExceeded: If the turn of the caller is more than max_wait seconds away.
+		"""
+
+		with self.lock:
+			now = time.monotonic()
+			self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+			self.updated_at = now
+
+			# A negative balance is a queue of callers, each waiting for its own token
+			self.tokens -= 1
+			wait = max(-self.tokens / self.rate, self.blocked_until - now, 0.0)
+
+			if wait > self.max_wait:
+				self.tokens += 1
+				raise RateLimitExceeded(f"The {self.name} API rate limit is reached, retry in {wait:.1f} seconds.")
+
+		if wait > 0:
+			time.sleep(wait)
+
+	def has_headroom(self, reserve: float = 0.5, max_usage: float = 50.0) -> bool:
+		"""
+		Method to tell whether background work can send a request without taking capacity from the users.
+
+		Args:
+			reserve (float): The share of the burst that must be left available.
+			max_usage (float): The usage percentage reported by the API above which there is no headroom.
+
+		Returns:
+			bool: True if a request can be sent without making the users wait, False otherwise.
+		"""
+
+		with self.lock:
+			now = time.monotonic()
+			tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+
+			return now >= self.blocked_until and self.usage < max_usage and tokens - 1 >= self.burst * reserve
+
+	def observe(self, response: requests.Response) -> None:
+		"""
+		Method to adapt the rate to the usage headers and the throttling status of a response.
+
+		Args:
+			response (requests.Response): The response of the upstream API.
+		"""
+
+		now = time.monotonic()
+		usage, regain_access = self.read_usage(response.headers)
+
+		with self.lock:
+			if response.status_code == 429:
+				retry_after = response.headers.get("Retry-After", "")
+
+				# The responses of the requests in flight when the block started do not halve the rate again
+				if now >= self.blocked_until:
+					self.rate = max(self.min_rate, self.rate / 2)
+
+				self.blocked_until = max(self.blocked_until, now + (float(retry_after) if retry_after.isdigit() else 60.0))
+
+			if regain_access > 0:
+				self.blocked_until = max(self.blocked_until, now + regain_access)
+
+			if usage is None:
+				return
+
+			self.usage = usage
+
+			# The rate follows the reported usage, so a burst of responses reporting the same usage slows it down once,
+			# from the full rate at 50% down to the floor at 100%
+			target = min(self.max_rate, max(self.min_rate, self.max_rate * (100 - usage) / 50))
+
+			# Slow down right away, speed up slowly
+			if target < self.rate:
+				self.rate = target
+			else:
+				self.rate = min(target, self.rate + self.max_rate * 0.1)
+
+	def read_usage(self, headers: dict) -> tuple:
+		"""
+		Method to read the Graph API usage headers (X-App-Usage and X-Business-Use-Case-Usage).
+
+		Args:
+			headers (dict): The response headers.
+
+		Returns:
+			tuple: The highest usage percentage (None if there is no usage header) and the number of seconds before the access is regained.
+		"""
+
+		usage = None
+		regain_access = 0.0
+
+		try:
+			app_usage = headers.get("X-App-Usage")
+			if app_usage:
+				usage = max(float(value) for value in json.loads(app_usage).values())
+
+			business_usage = headers.get("X-Business-Use-Case-Usage")
+			if business_usage:
+				for entries in json.loads(business_usage).values():
+					for entry in entries:
+						usage = max(usage or 0.0, *(float(entry.get(key, 0)) for key in ("call_count", "total_cputime", "total_time")))
+						regain_access = max(regain_access, float(entry.get("estimated_time_to_regain_access", 0)) * 60)
+		except (ValueError, TypeError, AttributeError):
+			# Malformed usage headers are ignored
+			pass
+
+		return usage, regain_access
+
+	def stats(self) -> dict:
+		"""
+		Method to get the current state of the limiter.
+
+		Returns:
+			dict: The current rate, the last reported usage and the seconds left before the access is regained.
+		"""
+
+		return {
+			"rate": self.rate,
+			"usage": self.usage,
+			"blocked_for": max(0.0, self.blocked_until - time.monotonic())
+		}
+
+
+# Instantiate the rate limiters shared by all the requests, one per upstream API
+facebook_rate_limiter = RateLimiter(
+	"Facebook",
+	rate=float(os.getenv("FACEBOOK_RATE_LIMIT", 5)),
+	burst=int(os.getenv("FACEBOOK_RATE_BURST", 10)),
+	max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", 2))
+)
+tiktok_rate_limiter = RateLimiter(
+	"TikTok",
+	rate=float(os.getenv("TIKTOK_RATE_LIMIT", 5)),
+	burst=int(os.getenv("TIKTOK_RATE_BURST", 10)),
+	max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", 2))
+)
@@ -0,0 +1,190 @@
+import datetime as dt
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseArchive:
+	"""
+	Class to archive the raw API responses in the background, as gzipped NDJSON segment files.
+	"""
+
+	def __init__(
+			self,
+			directory: str,
+			enabled: bool = False,
+			queue_size: int = 256,
+			segment_bytes: int = 64 * 1024 * 1024
+		) -> None:
+		"""
+		Constructor to initialize the archive queue. The writer thread is only started when the archive is enabled.
+
+		Args:
+			directory (str): The directory of the segment files.
+			enabled (bool): Whether the responses are archived at all.
+			queue_size (int): The maximum number of responses waiting to be written.
+			segment_bytes (int): The number of uncompressed bytes after which a new segment file is started.
+		"""
+
+		self.directory = directory
+		self.enabled = enabled
+		self.segment_bytes = segment_bytes
+		self.queue = queue.Queue(maxsize=queue_size)
+		self.dropped = 0
+		self.segment = None
+		self.segment_written = 0
+		self.closed = False
+		self.writer = None
+
+		if self.enabled:
+			os.makedirs(self.directory, exist_ok=True)
+			self.writer = threading.Thread(target=self.run, name="response-archive", daemon=True)
+			self.writer.start()
+
+	def submit(self, source: str, response: dict) -> bool:
+		"""
+		Method to queue a response for archival, without ever blocking the request.
+
+		Args:
+			source (str): The API the response comes from (e.g. "facebook").
+			response (dict): The JSON response.
+
+		Returns:
+			bool: True if the response was queued, False if the archive is disabled, full or the response is not serializable.
+		"""
+
+		if not self.enabled or self.closed:
+			return False
+
+		record = {
+			"source": source,
+			"archived_at": dt.datetime.now(dt.UTC).isoformat(),
+			"response": response
+		}
+
+		# The response is shared with the caches and the caller, it is serialized before anyone can modify it
+		try:
+			line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+		except (TypeError, ValueError):
+			self.dropped += 1
+			return False
+
+		try:
+			self.queue.put_nowait(line)
+		except queue.Full:
+			# The writer is behind, the record is dropped rather than stalling the request
+			self.dropped += 1
+			return False
+
+		return True
+
+	def run(self) -> None:
+		"""
+		Method run by the writer thread, appending the queued records to the current segment file until the archive is closed.
+		"""
+
+		stopping = False
+
+		while not stopping:
+			lines = [self.queue.get()]
+
+			# Write everything already waiting in one go
+			while True:
+				try:
+					lines.append(self.queue.get_nowait())
+				except queue.Empty:
+					break
+
+			# None is queued by close(), after the last record
+			if None in lines:
+				stopping = True
+				lines = [line for line in lines if line is not None]
+
+			if not lines:
+				continue
+
+			try:
+				self.write(lines)
+			except Exception:
+				# The writer thread must survive anything, the records are counted as dropped instead
+				logger.exception("Could not archive %d responses", len(lines))
+				self.dropped += len(lines)
+
+	def write(self, lines: list[bytes]) -> None:
+		"""
+		Method to append serialized records to the current segment file, rotating it when it is full.
+
+		Args:
+			lines (list[bytes]): The NDJSON lines of the records.
+		"""
+
+		for line in lines:
+			if self.segment is None or self.segment_written >= self.segment_bytes:
+				self.rotate()
+
+			self.segment.write(line)
+			self.segment_written += len(line)
+
+		self.segment.flush()
+
+	def rotate(self) -> None:
+		"""
+		Method to close the current segment file and open a new one.
+		"""
+
+		if self.segment is not None:
+			self.segment.close()
+
+		timestamp = dt.datetime.now(dt.UTC).strftime("%Y%m%dT%H%M%S%f")
+		path = os.path.join(self.directory, f"responses-{timestamp}-{os.getpid()}.ndjson.gz")
+
+		self.segment = gzip.open(path, "ab")
+		self.segment_written = 0
+
+	def close(self, timeout: float = 10.0) -> None:
+		"""
+		Method to write the queued records and close the current segment file, so that its gzip trailer is complete.
+
+		Args:
+			timeout (float): The maximum number of seconds to wait for the writer thread.
+		"""
+
+		if self.closed:
+			return
+
+		self.closed = True
+
+		if self.writer is not None:
+			try:
+				self.queue.put(None, timeout=timeout)
+			except queue.Full:
+				pass
+			self.writer.join(timeout)
+
+			if self.writer.is_alive():
+				# The writer still owns the segment file, closing it now could corrupt it
+				logger.warning("Could not close the response archive, its writer is still busy")
+				return
+
+		if self.segment is not None:
+			self.segment.close()
+			self.segment = None
+
+
+# Instantiate the response archive shared by the ads APIs (disabled unless ADS_ARCHIVE_ENABLED is set)
+response_archive = ResponseArchive(
+	directory=os.getenv("ADS_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive")),
+	enabled=os.getenv("ADS_ARCHIVE_ENABLED", "false").lower() in ("1", "true", "yes"),
+	queue_size=int(os.getenv("ADS_ARCHIVE_QUEUE_SIZE", 256)),
+	segment_bytes=int(os.getenv("ADS_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024))
+)
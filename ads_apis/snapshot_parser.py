@@ -0,0 +1,133 @@
+import json
+import re
+from typing import Iterable
+
+# Keys of the media urls embedded in the render_ad snapshot page, e.g. "video_sd_url":"https:\/\/video..."
+MEDIA_KEY_PATTERN = re.compile(rb'"(video_sd_url|video_hd_url|original_image_url|resized_image_url)":"')
+
+# Longest key the pattern can match, used to keep a partial key between two chunks
+MAX_KEY_LENGTH = len(b'"original_image_url":"')
+
+# Values longer than this are not urls, they are dropped instead of being buffered forever
+MAX_VALUE_LENGTH = 64 * 1024
+
+# The video url the ads are served with, many snapshots have no HD url and would otherwise be read to the end
+DEFAULT_STOP_KEYS = ("video_sd_url",)
+
+
+class SnapshotParser:
+	"""
+	Class to extract the media urls from an ad snapshot page, reading its body chunk by chunk.
+	"""
+
+	def __init__(self, stop_keys: tuple = DEFAULT_STOP_KEYS) -> None:
+		"""
+		Constructor to initialize the scan buffer and the extracted media.
+
+		Args:
+			stop_keys (tuple): The keys after which the rest of the page does not need to be read.
+		"""
+
+		self.stop_keys = stop_keys
+		self.buffer = bytearray()
+		self.media = {
+			"video_sd_url": None,
+			"video_hd_url": None,
+			"image_urls": []
+		}
+
+	@property
+	def done(self) -> bool:
+		"""
+		Property telling whether all the stop keys have been found.
+
+		Returns:
+			bool: True if the rest of the page can be skipped, False otherwise.
+		"""
+
+		return all(self.media[key] is not None for key in self.stop_keys)
+
+	def feed(self, chunk: bytes) -> bool:
+		"""
+		Method to scan the next chunk of the page body.
+
+		Args:
+			chunk (bytes): The next chunk of the page body.
+
+		Returns:
+			bool: True if the rest of the page can be skipped, False otherwise.
+		"""
+
+		self.buffer += chunk
+		position = 0
+
+		while True:
+			match = MEDIA_KEY_PATTERN.search(self.buffer, position)
+			if match is None:
+				# Only keep the tail that may hold the beginning of a key
+				position = max(position, len(self.buffer) - MAX_KEY_LENGTH + 1)
+				break
+
+			value_end = self.buffer.find(b'"', match.end())
+			if value_end == -1:
+				# The value continues in the next chunk, unless it is too long to be a url
+				if len(self.buffer) - match.end() > MAX_VALUE_LENGTH:
+					position = len(self.buffer)
+				else:
+					position = match.start()
+				break
+
+			self.store(match.group(1), self.buffer[match.end():value_end])
+			position = value_end + 1
+
+			if self.done:
+				break
+
+		del self.buffer[:position]
+		return self.done
+
+	def store(self, key: bytes, value: bytearray) -> None:
+		"""
+		Method to unescape a media url and store it under its key.
+
+		Args:
+			key (bytes): The key the url was found under.
+			value (bytearray): The escaped url.
+		"""
+
+		url = value.replace(b"\\/", b"/")
+		if b"\\" in url:
+			# Rarer escapes such as \u0026 are left to the JSON decoder, a malformed value is skipped
+			try:
+				url = json.loads(b'"' + url + b'"')
+			except ValueError:
+				return
+		else:
+			url = url.decode("utf-8", errors="replace")
+
+		if key in (b"original_image_url", b"resized_image_url"):
+			if url not in self.media["image_urls"]:
+				self.media["image_urls"].append(url)
+		elif self.media[key.decode()] is None:
+			self.media[key.decode()] = url
+
+
+def parse_snapshot(chunks: Iterable[bytes], stop_keys: tuple = DEFAULT_STOP_KEYS) -> dict:
+	"""
+	Function to extract the media urls from the chunks of an ad snapshot page, stopping as soon as the stop keys are found.
+
+	Args:
+		chunks (Iterable[bytes]): The chunks of the page body (e.g. response.iter_content()).
+		stop_keys (tuple): The keys after which the rest of the page does not need to be read.
+
+	Returns:
+		dict: The "video_sd_url", "video_hd_url" (None if not found before the stop keys) and "image_urls" of the ad.
+	"""
+
+	parser = SnapshotParser(stop_keys)
+
+	for chunk in chunks:
+		if parser.feed(chunk):
+			break
+
+	return parser.media
@@ -2,7 +2,11 @@ import os
 import urllib.parse
 
 import requests
+from .circuit_breaker import CircuitBreaker, CircuitOpen, tiktok_circuit_breaker
 from .countries import CountryCodes
+from .http_client import HttpClient, http_client
+from .rate_limiter import RateLimiter, RateLimitExceeded, tiktok_rate_limiter
+from .token_cache import TokenCache, tiktok_token_cache
 from dotenv import load_dotenv
 
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
@@ -32,11 +36,27 @@ class TikTokAPI:
     Class to interact with the TikTok Ads API.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            http_client: HttpClient = http_client,
+            token_cache: TokenCache = tiktok_token_cache,
+            rate_limiter: RateLimiter = tiktok_rate_limiter,
+            circuit_breaker: CircuitBreaker = tiktok_circuit_breaker
+        ) -> None:
         """
         Constructor to initialize the access token and the API root.
+
+        Args:
+            http_client (HttpClient): The pooled HTTP client used to reach the API.
+            token_cache (TokenCache): The cache keeping the access token until it expires.
+            rate_limiter (RateLimiter): The limiter pacing the requests to the research API.
+            circuit_breaker (CircuitBreaker): The breaker failing fast while the TikTok API is down.
         """
 
+        self.http_client = http_client
+        self.token_cache = token_cache
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
         self.access_token = None
         self.api_root = "https://open.tiktokapis.com/v2"
 
@@ -58,7 +78,7 @@ class TikTokAPI:
         headers = {
             "Content-Type": "application/x-www-form-urlencoded"
         }
-        response = requests.post(f"{self.api_root}/oauth/token/", data=query_param, headers=headers)
+        response = self.http_client.post(f"{self.api_root}/oauth/token/", data=query_param, headers=headers)
 
         response_data = response.json()
         if response_data.get("access_token", None):
@@ -70,7 +90,10 @@ class TikTokAPI:
             self,
             search_term: str,
             country: str = CountryCodes.IT,
-            ad_published_date_range: DateRange = DateRange("20230102","20230109")
+            ad_published_date_range: DateRange = DateRange("20230102","20230109"),
+            fields: str | None = None,
+            search_id: str | None = None,
+            max_count: int | None = None
         ) -> dict:
         """
         Method to get the ads from the TikTok Ads API.
@@ -79,13 +102,44 @@ class TikTokAPI:
             search_term (str): The search term.
             country (str): The country (default is US).
             ad_published_date_range (DateRange): The date range.
+            fields (str): The comma separated fields of the ads to return (default is id, reach, videos, advertiser name and images).
+            search_id (str): The "search_id" cursor of the previous page, to get the next one (default is the first page).
+            max_count (int): The number of ads per page (default is the API default).
 
         Returns:
             dict: The JSON response from the API endpoint (containing the TikTok ads data).
         """
 
-        token_response = self.get_access_token()
+        try:
+            # Fail fast instead of holding a worker while the TikTok API is down
+            self.circuit_breaker.allow()
+        except CircuitOpen as e:
+            return {
+                "error": "The TikTok API is unavailable or its rate limit is reached.",
+                "details": str(e)
+            }
+
+        try:
+            self.rate_limiter.acquire()
+        except RateLimitExceeded as e:
+            self.circuit_breaker.release()
+            return {
+                "error": "The TikTok API is unavailable or its rate limit is reached.",
+                "details": str(e)
+            }
+
+        try:
+            # The token is only requested again when the cached one is about to expire
+            token_response = self.token_cache.get(self.get_access_token)
+        except requests.exceptions.RequestException as e:
+            self.circuit_breaker.record_failure()
+            return {
+                "error": "An error occurred while requesting the access token.",
+                "details": str(e)
+            }
+
         if token_response.get("error", None):
+            self.circuit_breaker.record_success()
             return token_response
 
         api_endpoint = f"{self.api_root}/research/adlib/ad/query/"
@@ -101,8 +155,14 @@ class TikTokAPI:
             "search_term": search_term
         }
 
+        if search_id is not None:
+            data_filters["search_id"] = search_id
+
+        if max_count is not None:
+            data_filters["max_count"] = max_count
+
         params = {
-            "fields": "ad.id,ad.reach,ad.videos,advertiser.business_name,ad.image_urls"
+            "fields": fields or "ad.id,ad.reach,ad.videos,advertiser.business_name,ad.image_urls"
         }
 
         headers = {
@@ -111,7 +171,7 @@ class TikTokAPI:
         }
 
         try:
-            response = requests.post(
+            response = self.http_client.post(
                 api_endpoint,
                 params = params,
                 headers = headers,
@@ -119,11 +179,19 @@ class TikTokAPI:
             )
 
         except requests.exceptions.RequestException as e:
+            self.circuit_breaker.record_failure()
             return {
                 "error": "An error occurred while making the request.",
                 "details": str(e)
             }
 
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+        self.rate_limiter.observe(response)
+
         return response.json()
 
 # print(TikTokAPI().get_ads("cats"))
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from typing import Callable
+
+from dotenv import load_dotenv
+
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class TokenCache:
+	"""
+	Class to keep an OAuth client-credentials token until shortly before it expires.
+	"""
+
+	def __init__(self, expiry_margin: float = 60.0, refresh_ahead: float = 300.0) -> None:
+		"""
+		Constructor to initialize the cached token and the refresh lock.
+
+		Args:
+			expiry_margin (float): The number of seconds before "expires_in" after which the token is no longer served.
+			refresh_ahead (float): The number of seconds before "expires_in" after which a background refresh is started.
+		"""
+
+		self.expiry_margin = expiry_margin
+		self.refresh_ahead = max(refresh_ahead, expiry_margin)
+		self.token_response = None
+		self.expires_at = 0.0
+		self.lock = threading.Lock()
+		self.refreshing_lock = threading.Lock()
+		self.refreshing = False
+
+	def get(self, fetch: Callable[[], dict]) -> dict:
+		"""
+		Method to get the cached token response, fetching a new one if it is missing or about to expire.
+
+		Args:
+			fetch (Callable[[], dict]): The function requesting a new token from the token endpoint.
+
+		Returns:
+			dict: The JSON response of the token endpoint (containing the access token, or the error).
+		"""
+
+		now = time.monotonic()
+
+		if self.token_response is not None and now < self.expires_at - self.expiry_margin:
+			if now >= self.expires_at - self.refresh_ahead:
+				self.refresh_in_background(fetch)
+			return self.token_response
+
+		# Only one caller fetches the stale token, the others wait and reuse its result
+		with self.lock:
+			if self.token_response is not None and time.monotonic() < self.expires_at - self.expiry_margin:
+				return self.token_response
+
+			return self.refresh(fetch)
+
+	def refresh(self, fetch: Callable[[], dict]) -> dict:
+		"""
+		Method to fetch a new token and cache it. Error responses are returned but not cached.
+
+		Args:
+			fetch (Callable[[], dict]): The function requesting a new token from the token endpoint.
+
+		Returns:
+			dict: The JSON response of the token endpoint.
+		"""
+
+		requested_at = time.monotonic()
+		token_response = fetch()
+
+		if token_response.get("access_token", None) and not token_response.get("error", None):
+			self.expires_at = requested_at + float(token_response.get("expires_in", 0))
+			self.token_response = token_response
+
+		return token_response
+
+	def refresh_in_background(self, fetch: Callable[[], dict]) -> None:
+		"""
+		Method to refresh the token in a background thread, unless a refresh is already running.
+
+		Args:
+			fetch (Callable[[], dict]): The function requesting a new token from the token endpoint.
+		"""
+
+		# The flag has its own lock so that valid-token callers never wait on a running fetch
+		with self.refreshing_lock:
+			if self.refreshing:
+				return
+			self.refreshing = True
+
+		def run() -> None:
+			try:
+				with self.lock:
+					self.refresh(fetch)
+			except Exception:
+				# The current token is still valid, the next caller will retry
+				pass
+			finally:
+				self.refreshing = False
+
+		threading.Thread(target=run, name="token-refresh", daemon=True).start()
+
+	def clear(self) -> None:
+		"""
+		Method to drop the cached token, e.g. when the API rejects it.
+		"""
+
+		with self.lock:
+			self.token_response = None
+			self.expires_at = 0.0
+
+
+# Instantiate the token cache shared by all the TikTok API clients
+tiktok_token_cache = TokenCache(
+	expiry_margin=float(os.getenv("TIKTOK_TOKEN_EXPIRY_MARGIN", 60)),
+	refresh_ahead=float(os.getenv("TIKTOK_TOKEN_REFRESH_AHEAD", 300))
+)
@@ -0,0 +1,50 @@
+import gzip
+import json
+import os
+import sys
+import timeit
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+# Brotli is optional, its sizes are skipped when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Sample Graph API response (one page of 25 ads)
+payload_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fb_ads.json")
+
+
+def benchmark(pages: int = 1, runs: int = 200) -> None:
+    """
+    Function to compare the serialization time and the size on the wire of an ads payload.
+
+    Args:
+        pages (int): The number of copies of the sample page merged in the payload.
+        runs (int): The number of serializations timed per encoder.
+    """
+
+    with open(payload_path) as f:
+        page = json.load(f)
+
+    payload = dict(page, data=page["data"] * pages)
+
+    # FastAPI's default path: jsonable_encoder walk, then the stdlib encoder
+    stdlib = timeit.timeit(lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8"), number=runs) / runs
+    fast = timeit.timeit(lambda: orjson.dumps(payload), number=runs) / runs
+
+    body = orjson.dumps(payload)
+
+    print(f"Payload: {len(payload['data'])} ads, {len(body)} bytes")
+    print(f"jsonable_encoder + json: {stdlib * 1000:.3f} ms")
+    print(f"orjson:                  {fast * 1000:.3f} ms ({stdlib / fast:.1f}x faster)")
+    print(f"gzip (level 6):          {len(gzip.compress(body, compresslevel=6))} bytes")
+
+    if brotli is not None:
+        print(f"brotli (quality 4):      {len(brotli.compress(body, quality=4))} bytes")
+
+
+if __name__ == "__main__":
+    benchmark(pages=int(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -1,4 +1,7 @@
-from fastapi import HTTPException, status
+from typing import Any
+
+from fastapi import Header, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi_utils.cbv import cbv
 from fastapi_utils.inferring_router import InferringRouter
 
@@ -21,47 +24,194 @@ class ApiController:
         self.api_service = ApiService()
 
     @api_controller_router.post("/facebook_ads")
-    def facebook_ads(self, email: str, search_term: str = "dropshipping", country: str = "us") -> dict:
+    def facebook_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: list[str] = Query(["us"]),
+            from_catalog: bool = False,
+            fields: str | None = None,
+            dedup: bool = False,
+            token: str = Header(None)
+        ) -> Any:
         """
         Method to get the ads from the Facebook Ads API.
 
         Args:
             email (str): The email of the user.
-            country (str): The country name to filter the ads.
+            country (list[str]): The country names to filter the ads, searched in parallel and merged if there are several.
             search_term (str): The search term.
+            from_catalog (bool): Whether the ads are read from the local ads catalog, once synced, instead of the Facebook Ads API.
+            fields (str): The comma separated Graph API fields of the ads to return (e.g. "id,page_id,ad_delivery_start_time").
+            dedup (bool): Whether only one ad per creative is returned, with its "creative_count" and "creative_ids".
+            token (str): The access token of the user, required in the stateless auth mode.
 
         Returns:
             dict: The JSON response from the API endpoint (containing the Facebook ads data).
         """
 
         try:
-            return self.api_service.facebook_ads(email, search_term, country)
+            # The ads are serialized by orjson directly, without the jsonable_encoder walk
+            return ORJSONResponse(self.api_service.facebook_ads(email, search_term, country, from_catalog, fields, dedup, token=token))
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
+    @api_controller_router.post("/search")
+    def search(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: list[str] = Query(["us"]),
+            timeout: float = Query(5.0, gt=0, le=30),
+            token: str = Header(None)
+        ) -> Any:
+        """
+        Method to search the ads of the Facebook and TikTok Ads APIs at the same time.
+
+        Args:
+            email (str): The email of the user.
+            country (list[str]): The country names to filter the ads.
+            search_term (str): The search term.
+            timeout (float): The number of seconds to wait for the slowest platform.
+            token (str): The access token of the user, required in the stateless auth mode.
+
+        Returns:
+            dict: The normalized ads of the platforms that answered in time, with the status of each platform.
+        """
+
+        try:
+            return ORJSONResponse(self.api_service.search_ads(email, search_term, country, timeout, token=token))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    @api_controller_router.post("/facebook_ads/stream")
+    def facebook_ads_stream(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: str = "us",
+            max_ads: int = 100,
+            fields: str | None = None,
+            dedup: bool = False,
+            token: str = Header(None)
+        ) -> Any:
+        """
+        Method to stream the ads from the Facebook Ads API as NDJSON, following the pagination.
+
+        Args:
+            email (str): The email of the user.
+            country (str): The country name to filter the ads.
+            search_term (str): The search term.
+            max_ads (int): The maximum number of ads to stream.
+            fields (str): The comma separated Graph API fields of the ads to return.
+            dedup (bool): Whether only the first ad of each creative is streamed, with a last line listing the duplicates.
+            token (str): The access token of the user, required in the stateless auth mode.
+
+        Returns:
+            StreamingResponse: The ads, one JSON object per line, sent as each page arrives.
+        """
+
+        try:
+            lines = self.api_service.stream_facebook_ads(email, search_term, country, max_ads, fields, dedup, token=token)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    @api_controller_router.post("/ads/refine")
+    def refine_ads(
+            self,
+            email: str,
+            query: str | None = None,
+            platform: str | None = None,
+            page_id: str | None = None,
+            date_min: str | None = None,
+            date_max: str | None = None,
+            limit: int = Query(100, gt=0, le=1000),
+            token: str = Header(None)
+        ) -> Any:
+        """
+        Method to refine the searches over the ads already fetched (by keyword, page and delivery window).
+
+        Args:
+            email (str): The email of the user.
+            query (str): The keywords the ads must all contain, in the search terms they were found with or their advertiser
+                name (their creative texts are only searchable if they were requested in the "fields" of the search).
+            platform (str): The platform of the ads ("facebook" or "tiktok").
+            page_id (str): The page (or TikTok business) id of the ads.
+            date_min (str): The date ("YYYY-MM-DD") the ads must have been delivered until at least.
+            date_max (str): The date ("YYYY-MM-DD") the ads must have started being delivered by.
+            limit (int): The maximum number of ads returned.
+            token (str): The access token of the user, required in the stateless auth mode.
+
+        Returns:
+            dict: The normalized matching ads, most recently fetched first, and whether there are more of them.
+        """
+
+        try:
+            return ORJSONResponse(self.api_service.refine_ads(email, query, platform, page_id, date_min, date_max, limit, token=token))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    @api_controller_router.get("/cache_stats")
+    def cache_stats(self) -> dict:
+        """
+        Method to get the counters of the ads results cache.
+
+        Returns:
+            dict: The hits, stale hits, misses, evictions, revalidations and fallbacks counters and the current size.
+        """
+
+        return self.api_service.cache_stats()
+
     @api_controller_router.get("/test_facebook_ads")
-    def test_facebook_ads(self, search_term: str = "dropshipping", country: str = "us")->dict:
-        return self.api_service.test_facebook_ads(search_term,country)
+    def test_facebook_ads(self, search_term: str = "dropshipping", country: str = "us")->Any:
+        return ORJSONResponse(self.api_service.test_facebook_ads(search_term,country))
     
     @api_controller_router.get("/test_data")
-    def test_facebook_ads(self)->dict:
-        return self.api_service.test_data()
+    def test_facebook_ads(self)->Any:
+        return ORJSONResponse(self.api_service.test_data())
 
     @api_controller_router.post("/tiktok_ads")
-    def tiktok_ads(self, email: str, search_term: str = "dropshipping", country: str = "us") -> dict:
+    def tiktok_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: list[str] = Query(["us"]),
+            fields: str | None = None,
+            dedup: bool = False,
+            date_min: str | None = None,
+            date_max: str | None = None,
+            token: str = Header(None)
+        ) -> Any:
         """
         Method to get the ads from the TikTok Ads API.
 
         Args:
             email (str): The email of the user.
-            country (str): The country name to filter the ads.
+            country (list[str]): The country names to filter the ads, searched in parallel and merged if there are several.
             search_term (str): The search term.
+            fields (str): The comma separated TikTok fields of the ads to return (e.g. "ad.id,advertiser.business_name").
+            dedup (bool): Whether only one ad per creative is returned, with its "creative_count" and "creative_ids".
+            date_min (str): The first publication date ("YYYY-MM-DD") of the ads, the range is fetched as parallel shards.
+            date_max (str): The last publication date ("YYYY-MM-DD") of the ads (default is today), only with a date_min.
+            token (str): The access token of the user, required in the stateless auth mode.
 
         Returns:
             dict: The JSON response from the API endpoint (containing the TikTok ads data).
         """
 
         try:
-            return self.api_service.tiktok_ads(email, search_term, country)
+            return ORJSONResponse(self.api_service.tiktok_ads(email, search_term, country, fields, dedup, date_min, date_max, token=token))
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -6,6 +6,7 @@ from fastapi_utils.inferring_router import InferringRouter
 
 from DTOs.CustomResponseMessage import CustomResponseMessage
 from DTOs.user import LoginSchema, User
+from services.password_hasher import PasswordHasherBusy
 from services.user_service import UserService
 
 user_controller_router = InferringRouter()
@@ -48,6 +49,14 @@ class UserController:
                 # Raise an exception if the user already exists or the password is not strong enough
                 raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="User already exists or password is not strong enough.")
 
+        except PasswordHasherBusy as e:
+            # Shed the load instead of queueing more passwords behind the busy workers
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+
+        except HTTPException:
+            # The expected errors keep their status code
+            raise
+
         except Exception as e:
             # Raise an exception if there is an error
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -75,6 +84,14 @@ class UserController:
 
             return access_token
 
+        except PasswordHasherBusy as e:
+            # Shed the load instead of queueing more passwords behind the busy workers
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+
+        except HTTPException:
+            # The expected errors keep their status code
+            raise
+
         except Exception as e:
             # Raise an exception if there is an error
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -100,6 +117,10 @@ class UserController:
             self.user_service.logout(token)
             return CustomResponseMessage(status_code=200, message="Logged out successfully")
 
+        except HTTPException:
+            # The expected errors keep their status code
+            raise
+
         except Exception as e:
             # Raise an exception if there is an error
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
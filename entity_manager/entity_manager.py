@@ -1,7 +1,7 @@
 import os
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, MongoClient
 
 # Load environment variables from the .env file
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
@@ -16,6 +16,45 @@ CONNECTION_STRING = mongo_uri
 # Create a MongoDB client
 client = MongoClient(CONNECTION_STRING)
 
+# Collection names used when their environment variable is not set
+COLLECTION_DEFAULTS = {
+    "ADS_CATALOG_COLLECTION": "ads_catalog",
+    "ADS_CATALOG_SYNC_COLLECTION": "ads_catalog_sync",
+    "ADS_CATALOG_LEASE_COLLECTION": "ads_catalog_lease",
+    "REVOKED_TOKENS_COLLECTION": "revoked_tokens",
+}
+
+# Indexes created at startup: (collection environment variable, keys, options)
+INDEXES = [
+    # Registration and login look the users up by email
+    ("USER_COLLECTION", [("email", ASCENDING)], {"unique": True}),
+
+    # Session checks look the sessions up by email, logout by access token
+    ("ACTIVE_SESSIONS_COLLECTION", [("email", ASCENDING), ("expiry_time", ASCENDING)], {}),
+    ("ACTIVE_SESSIONS_COLLECTION", [("access_token", ASCENDING)], {}),
+
+    # MongoDB removes the sessions once their token has expired
+    ("ACTIVE_SESSIONS_COLLECTION", [("expiry_time", ASCENDING)], {"expireAfterSeconds": 0}),
+
+    # The catalog sync upserts the ads by id
+    ("ADS_CATALOG_COLLECTION", [("id", ASCENDING)], {"unique": True}),
+
+    # Searches served from the catalog: search term and country, most recent ads first
+    ("ADS_CATALOG_COLLECTION", [("search_terms", ASCENDING), ("reached_countries", ASCENDING), ("ad_delivery_start_time", DESCENDING)], {}),
+
+    # Advertiser and date window filters
+    ("ADS_CATALOG_COLLECTION", [("page_id", ASCENDING), ("ad_delivery_start_time", DESCENDING), ("ad_delivery_stop_time", DESCENDING)], {}),
+    ("ADS_CATALOG_COLLECTION", [("reached_countries", ASCENDING), ("ad_delivery_start_time", DESCENDING), ("ad_delivery_stop_time", DESCENDING)], {}),
+    ("ADS_CATALOG_SYNC_COLLECTION", [("search_term", ASCENDING), ("country", ASCENDING)], {"unique": True}),
+
+    # The revocations are upserted by token id and polled by revocation date
+    ("REVOKED_TOKENS_COLLECTION", [("token_id", ASCENDING)], {"unique": True}),
+    ("REVOKED_TOKENS_COLLECTION", [("revoked_at", ASCENDING)], {}),
+
+    # A revoked token is rejected on its own once expired, MongoDB removes it then
+    ("REVOKED_TOKENS_COLLECTION", [("expiry_time", ASCENDING)], {"expireAfterSeconds": 0}),
+]
+
 # Create the entity manager
 class EntityManager:
     def __init__(self, client, database):
@@ -25,5 +64,14 @@ class EntityManager:
     def get_collection(self, collection_name):
         return self.client.get_database(self.db).get_collection(collection_name)
 
+    def ensure_indexes(self, indexes=INDEXES):
+        # Creating an index that already exists is a no-op, so this runs at every startup. A failure is raised, so that
+        # the application does not start without the unique indexes the registration and the catalog sync rely on
+        for collection_variable, keys, options in indexes:
+            collection_name = os.getenv(collection_variable, COLLECTION_DEFAULTS.get(collection_variable))
+            if not collection_name:
+                continue
+            self.get_collection(collection_name).create_index(keys, **options)
+
 # Instantiate the entity manager
 entity_manager = EntityManager(client, db)
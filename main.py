@@ -6,7 +6,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from controllers.api_controller import api_controller_router
+from ads_apis.response_archive import response_archive
 from controllers.user_controller import user_controller_router
+from entity_manager.entity_manager import entity_manager
+from middlewares.compression import CompressionMiddleware
+from services.catalog_sync import catalog_sync
+from services.password_hasher import password_hasher
+from services.prefetch_scheduler import prefetch_scheduler
+from services.revocation_list import revocation_list
 
 app = FastAPI()
 
@@ -31,6 +38,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add the compression middleware (brotli or gzip, for the responses larger than the minimum size)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024)),
+)
+
+# Create the missing database indexes before serving
+@app.on_event("startup")
+def ensure_indexes() -> None:
+    entity_manager.ensure_indexes()
+
+
+# Start and stop the background jobs with the application
+@app.on_event("startup")
+def start_background_jobs() -> None:
+    revocation_list.start()
+    catalog_sync.start()
+    prefetch_scheduler.start()
+
+
+@app.on_event("shutdown")
+def stop_background_jobs() -> None:
+    revocation_list.stop()
+    catalog_sync.stop()
+    prefetch_scheduler.stop()
+    password_hasher.shutdown()
+    response_archive.close()
+
+
 # Run the application
 if __name__ == '__main__':
     uvicorn.run(app, host="127.0.0.1", port=8000)
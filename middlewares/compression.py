@@ -0,0 +1,170 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Brotli is optional, gzip is used alone when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Compressor:
+    """
+    Class to compress a response body incrementally with the negotiated encoding.
+    """
+
+    def __init__(self, encoding: str, level: int) -> None:
+        """
+        Constructor to initialize the gzip or brotli compressor.
+
+        Args:
+            encoding (str): The content encoding ("br" or "gzip").
+            level (int): The compression level (brotli quality or gzip level).
+        """
+
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=level)
+            self.compress = self.compressor.process
+            self.flush = self.compressor.flush
+            self.finish = self.compressor.finish
+        else:
+            # wbits=31 writes the gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self.compressor.compress
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self.compressor.flush
+
+
+class CompressionMiddleware:
+    """
+    Class to compress the responses with brotli or gzip, as negotiated with the Accept-Encoding header of the client.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        """
+        Constructor to initialize the compression settings.
+
+        Args:
+            app (ASGIApp): The application.
+            minimum_size (int): The body size in bytes below which the responses are sent uncompressed.
+            gzip_level (int): The gzip compression level.
+            brotli_quality (int): The brotli quality (low values are fast enough to compress on every request).
+        """
+
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def negotiate(self, accept_encoding: str) -> str | None:
+        """
+        Method to choose the content encoding of the response.
+
+        Args:
+            accept_encoding (str): The Accept-Encoding header of the request.
+
+        Returns:
+            str: "br" or "gzip".
+            None: None if the client accepts neither.
+        """
+
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in accept_encoding.split(",")
+            if not part.replace(" ", "").endswith(";q=0")
+        }
+
+        if brotli is not None and "br" in accepted:
+            return "br"
+
+        if "gzip" in accepted:
+            return "gzip"
+
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Method to run the application, compressing its response body on the way out.
+
+        Args:
+            scope (Scope): The ASGI connection scope.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.negotiate(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = self.brotli_quality if encoding == "br" else self.gzip_level
+        start_message = None
+        compressor = None
+
+        async def send_compressed(message: Message) -> None:
+            """
+            Function to compress the response messages of the application before sending them.
+
+            Args:
+                message (Message): The ASGI message sent by the application.
+            """
+
+            nonlocal start_message, compressor
+
+            if message["type"] == "http.response.start":
+                # Wait for the first body chunk to know whether the response is worth compressing
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None and start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                already_encoded = "content-encoding" in headers
+
+                if already_encoded or (not more_body and len(body) < self.minimum_size):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                compressor = Compressor(encoding, level)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+
+                if more_body:
+                    # Streaming responses are compressed chunk by chunk
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                await send(start_message)
+                start_message = None
+
+            if compressor is None:
+                await send(message)
+                return
+
+            if more_body:
+                # Each NDJSON chunk is flushed so that the client gets it right away
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.flush(), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.compress(body) + compressor.finish()})
+
+        await self.app(scope, receive, send_compressed)
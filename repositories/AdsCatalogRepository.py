@@ -0,0 +1,214 @@
+import datetime as dt
+import os
+from datetime import datetime, timedelta
+from typing import Any
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from entity_manager.entity_manager import entity_manager
+from repositories.IAdsCatalogRepository import IAdsCatalogRepository
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+# Fields of the Facebook ads stored in the catalog (the media urls are signed and expire, they are not stored)
+CATALOG_FIELDS = ("id", "page_id", "page_name", "ad_delivery_start_time", "ad_delivery_stop_time", "ad_snapshot_url")
+
+
+class AdsCatalogRepository(IAdsCatalogRepository):
+    """
+    This class is responsible for handling all the operations related to the ads catalog collection in the database.
+    """
+
+    def __init__(self) -> None:
+        """
+        The constructor initializes the entity manager for the ads catalog collection, the catalog sync state collection
+        and the catalog sync lease collection.
+        """
+
+        self.em = entity_manager.get_collection(os.environ.get("ADS_CATALOG_COLLECTION", "ads_catalog"))
+        self.syncStateEntityManager = entity_manager.get_collection(os.environ.get("ADS_CATALOG_SYNC_COLLECTION", "ads_catalog_sync"))
+        self.leaseEntityManager = entity_manager.get_collection(os.environ.get("ADS_CATALOG_LEASE_COLLECTION", "ads_catalog_lease"))
+
+
+    def upsert_ads(self, ads: list[dict], search_term: str, country: str) -> int:
+        """
+        This method is responsible for inserting or updating the ads in bulk, by ad id.
+
+        Args:
+            ads (list[dict]): The ads returned by the Facebook Ads API.
+            search_term (str): The search term the ads were found with.
+            country (str): The country the ads were found in.
+
+        Returns:
+            int: The number of ads inserted or modified.
+        """
+
+        now = datetime.now(dt.UTC)
+        operations = [
+            UpdateOne(
+                {"id": ad["id"]},
+                {
+                    "$set": dict({field: ad[field] for field in CATALOG_FIELDS if field in ad}, synced_at=now),
+                    "$addToSet": {"search_terms": search_term, "reached_countries": country},
+                    "$setOnInsert": {"first_seen_at": now}
+                },
+                upsert=True
+            )
+            for ad in ads if ad.get("id")
+        ]
+
+        if not operations:
+            return 0
+
+        result = self.em.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+
+    def find_ads(self, search_term: str, countries: list[str], page_id: str | None = None, limit: int = 100) -> list[dict]:
+        """
+        This method is responsible for finding the ads of a search in the catalog.
+
+        Args:
+            search_term (str): The search term.
+            countries (list[str]): The countries the ads must have reached (any of them).
+            page_id (str): The page the ads must belong to (default is any page).
+            limit (int): The maximum number of ads to return.
+
+        Returns:
+            list[dict]: The ads, most recent first.
+        """
+
+        query: dict[str, Any] = {"search_terms": search_term, "reached_countries": {"$in": countries}}
+        if page_id is not None:
+            query["page_id"] = page_id
+
+        cursor = self.em.find(query, {"_id": 0, "search_terms": 0, "synced_at": 0, "first_seen_at": 0})
+        return list(cursor.sort("ad_delivery_start_time", DESCENDING).limit(limit))
+
+
+    def get_last_sync(self, search_term: str, country: str) -> Any:
+        """
+        This method is responsible for getting the date of the last sync of a search.
+
+        Args:
+            search_term (str): The search term.
+            country (str): The country.
+
+        Returns:
+            datetime: The date of the last sync.
+            None: None if the search was never synced.
+        """
+
+        state = self.syncStateEntityManager.find_one({"search_term": search_term, "country": country})
+        return state.get("synced_at") if state is not None else None
+
+
+    def get_synced_countries(self, search_term: str, countries: list[str]) -> list[str]:
+        """
+        This method is responsible for getting the countries in which a search has been synced at least once.
+
+        Args:
+            search_term (str): The search term.
+            countries (list[str]): The countries.
+
+        Returns:
+            list[str]: The synced countries, in the order of countries.
+        """
+
+        states = self.syncStateEntityManager.find(
+            {"search_term": search_term, "country": {"$in": countries}, "synced_at": {"$ne": None}},
+            {"_id": 0, "country": 1}
+        )
+        synced = {state["country"] for state in states}
+
+        return [country for country in countries if country in synced]
+
+
+    def set_last_sync(self, search_term: str, country: str, synced_at: datetime) -> None:
+        """
+        This method is responsible for storing the date of the last sync of a search.
+
+        Args:
+            search_term (str): The search term.
+            country (str): The country.
+            synced_at (datetime): The date of the sync.
+        """
+
+        self.syncStateEntityManager.update_one(
+            {"search_term": search_term, "country": country},
+            {"$set": {"synced_at": synced_at}},
+            upsert=True
+        )
+
+
+    def track_search(self, search_term: str, country: str) -> None:
+        """
+        This method is responsible for adding a search to the searches kept up to date by the catalog sync.
+
+        Args:
+            search_term (str): The search term.
+            country (str): The country.
+        """
+
+        self.syncStateEntityManager.update_one(
+            {"search_term": search_term, "country": country},
+            {"$setOnInsert": {"tracked_at": datetime.now(dt.UTC)}},
+            upsert=True
+        )
+
+
+    def get_tracked_searches(self, limit: int) -> list[tuple]:
+        """
+        This method is responsible for getting the searches kept up to date by the catalog sync, tracked by any process.
+
+        Args:
+            limit (int): The maximum number of searches to return.
+
+        Returns:
+            list[tuple]: The (search term, country) searches, least recently synced first.
+        """
+
+        states = self.syncStateEntityManager.find({}, {"_id": 0, "search_term": 1, "country": 1})
+        return [(state["search_term"], state["country"]) for state in states.sort("synced_at", ASCENDING).limit(limit)]
+
+
+    def acquire_sync_lease(self, owner: str, seconds: float) -> bool:
+        """
+        This method is responsible for taking or renewing the lease of the catalog sync, so that a single process runs it.
+
+        Args:
+            owner (str): The id of the process asking for the lease.
+            seconds (float): The number of seconds the lease is held without being renewed.
+
+        Returns:
+            bool: True if the process holds the lease, False if another process does.
+        """
+
+        now = datetime.now(dt.UTC)
+
+        try:
+            # The upsert only inserts when the lease is missing, otherwise it collides with the lease held by another process
+            self.leaseEntityManager.update_one(
+                {"_id": "catalog_sync", "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+
+        return True
+
+
+    def release_sync_lease(self, owner: str) -> None:
+        """
+        This method is responsible for giving up the lease of the catalog sync, so that another process can take it right away.
+
+        Args:
+            owner (str): The id of the process holding the lease.
+        """
+
+        self.leaseEntityManager.delete_one({"_id": "catalog_sync", "owner": owner})
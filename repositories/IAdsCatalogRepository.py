@@ -0,0 +1,30 @@
+from abc import abstractmethod
+
+
+class IAdsCatalogRepository:
+    @abstractmethod
+    def upsert_ads(self, ads: list[dict], search_term: str, country: str) -> int: pass
+
+    @abstractmethod
+    def find_ads(self, search_term: str, countries: list[str], page_id: str | None = None, limit: int = 100) -> list[dict]: pass
+
+    @abstractmethod
+    def get_last_sync(self, search_term: str, country: str): pass
+
+    @abstractmethod
+    def set_last_sync(self, search_term: str, country: str, synced_at) -> None: pass
+
+    @abstractmethod
+    def get_synced_countries(self, search_term: str, countries: list[str]) -> list[str]: pass
+
+    @abstractmethod
+    def track_search(self, search_term: str, country: str) -> None: pass
+
+    @abstractmethod
+    def get_tracked_searches(self, limit: int) -> list[tuple]: pass
+
+    @abstractmethod
+    def acquire_sync_lease(self, owner: str, seconds: float) -> bool: pass
+
+    @abstractmethod
+    def release_sync_lease(self, owner: str) -> None: pass
@@ -0,0 +1,10 @@
+from abc import abstractmethod
+from datetime import datetime
+
+
+class IRevokedTokenRepository:
+    @abstractmethod
+    def revoke(self, token_id: str, email: str, expiry_time: datetime) -> None: pass
+
+    @abstractmethod
+    def find_revoked(self, revoked_since: datetime | None = None) -> list[dict]: pass
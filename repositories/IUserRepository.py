@@ -6,7 +6,10 @@ from DTOs.user import LoginSchema, User
 
 class IUserRepository:
     @abstractmethod
-    def register(self, user : User) -> User: pass
+    def register(self, user : User, hashed_password: str) -> User: pass
+
+    @abstractmethod
+    def is_email_registered(self, email: str) -> bool: pass
 
     @abstractmethod
     def create_access_token(self, data: dict, expires_delta: timedelta): pass
@@ -21,7 +24,13 @@ class IUserRepository:
     def authenticate(self, token: str): pass
 
     @abstractmethod
-    def is_password_correct(self, form_data: LoginSchema) -> bool: pass
+    def update_password(self, email: str, hashed_password: str): pass
+
+    @abstractmethod
+    def is_password_strong(self, password: str) -> bool: pass
+
+    @abstractmethod
+    def decode_token(self, token: str, verify_exp: bool = True) -> dict: pass
 
     @abstractmethod
     def register_token_in_session(self, token: str): pass
@@ -32,5 +41,8 @@ class IUserRepository:
     @abstractmethod
     def is_session_active(self, email: str): pass
 
+    @abstractmethod
+    def get_session_expiry(self, email: str): pass
+
     @abstractmethod
     def get_access_token_from_active_session(self, email: str): pass
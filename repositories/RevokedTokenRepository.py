@@ -0,0 +1,63 @@
+import datetime as dt
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING
+
+from entity_manager.entity_manager import entity_manager
+from repositories.IRevokedTokenRepository import IRevokedTokenRepository
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class RevokedTokenRepository(IRevokedTokenRepository):
+    """
+    This class is responsible for handling all the operations related to the revoked tokens collection in the database.
+    """
+
+    def __init__(self) -> None:
+        """
+        The constructor initializes the entity manager for the revoked tokens collection.
+        """
+
+        self.em = entity_manager.get_collection(os.environ.get("REVOKED_TOKENS_COLLECTION", "revoked_tokens"))
+
+
+    def revoke(self, token_id: str, email: str, expiry_time: datetime) -> None:
+        """
+        This method is responsible for recording a revoked token until it expires.
+
+        Args:
+            token_id (str): The hash of the token.
+            email (str): The email of the user.
+            expiry_time (datetime): The expiry time of the token.
+        """
+
+        self.em.update_one(
+            {"token_id": token_id},
+            {"$set": {"email": email, "expiry_time": expiry_time, "revoked_at": datetime.now(dt.UTC)}},
+            upsert=True
+        )
+
+
+    def find_revoked(self, revoked_since: datetime | None = None) -> list[dict]:
+        """
+        This method is responsible for getting the tokens revoked and not expired yet.
+
+        Args:
+            revoked_since (datetime): The time the tokens must have been revoked since (default is any time).
+
+        Returns:
+            list[dict]: The "token_id", "expiry_time" and "revoked_at" of the tokens, oldest revocation first.
+        """
+
+        query = {"expiry_time": {"$gt": datetime.now(dt.UTC)}}
+
+        if revoked_since is not None:
+            query["revoked_at"] = {"$gte": revoked_since}
+
+        projection = {"_id": 0, "token_id": 1, "expiry_time": 1, "revoked_at": 1}
+        return list(self.em.find(query, projection).sort("revoked_at", ASCENDING))
@@ -7,9 +7,8 @@ import jwt
 from dotenv import load_dotenv
 from fastapi import HTTPException, status
 from jwt import PyJWTError
-from passlib.context import CryptContext
-from passlib.hash import bcrypt
 from password_strength import PasswordStats
+from pymongo.errors import DuplicateKeyError
 
 from DTOs.user import ActiveSession, LoginSchema, User
 from entity_manager.entity_manager import entity_manager
@@ -19,9 +18,6 @@ from repositories.IUserRepository import IUserRepository
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-# CryptContext for hashing passwords
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class UserRepository(IUserRepository):
     """
@@ -37,40 +33,49 @@ class UserRepository(IUserRepository):
         self.activeSessionsEntityManager = entity_manager.get_collection(os.environ.get("ACTIVE_SESSIONS_COLLECTION"))
 
 
-    def register(self, user: User) -> Any:
+    def register(self, user: User, hashed_password: str) -> Any:
         """
         This method is responsible for registering a new user in the database.
 
         Args:
             user (User): The user object.
+            hashed_password (str): The hash of the password of the user.
 
         Returns:
             User: The user object if the user is registered successfully.
             bool: False if the user already exists.
         """
 
-        # Check if the email is already present in the database
-        is_email_already_present = self.em.find_one({"email": user.email})
-
-        # Check if the password is strong enough
-        is_password_strong = self.is_password_strong(user.password.get_secret_value())
-
-        # If the email is not present and the password is strong, register the user
-        if is_email_already_present is None and is_password_strong:
+        # The unique index on the email rejects the users already registered, even when registered at the same time
+        try:
             self.em.insert_one(
                 {
                     "first_name": user.first_name,
                     "last_name": user.last_name,
                     "email": user.email,
-                    "password": bcrypt.using(rounds=12).hash(user.password.get_secret_value()),
+                    "password": hashed_password,
                     "referral_code": user.referral_code,
                 }
             )
-            return user
-
-        else:
+        except DuplicateKeyError:
             return False
 
+        return user
+
+
+    def is_email_registered(self, email: str) -> bool:
+        """
+        This method is responsible for checking if a user is already registered with an email.
+
+        Args:
+            email (str): The email.
+
+        Returns:
+            bool: True if the email is already present in the database, False otherwise.
+        """
+
+        return self.em.find_one({"email": email}) is not None
+
 
     def create_access_token(self, data: dict, expires_delta: timedelta) -> str:
         """
@@ -117,25 +122,16 @@ class UserRepository(IUserRepository):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid user credentials.", headers={"WWW-Authenticate": "Bearer"})
 
 
-    def is_password_correct(self, form_data: LoginSchema) -> bool:
+    def update_password(self, email: str, hashed_password: str) -> None:
         """
-        This method is responsible for checking if the password is correct.
+        This method is responsible for replacing the password hash of a user.
 
         Args:
-            form_data: The form data containing the user email and password.
-
-        Returns:
-            bool: True if the password is correct, False otherwise.
+            email (str): The email of the user.
+            hashed_password (str): The new hash of the password.
         """
 
-        # Get the user from the database
-        user = self.get_user(form_data.email)
-
-        # Check if the password is correct or not
-        if user is None or not pwd_context.verify(form_data.password.get_secret_value(), user.password.get_secret_value()):
-            return False
-
-        return True
+        self.em.update_one({"email": email}, {"$set": {"password": hashed_password}})
 
 
     def is_password_strong(self, password: str) -> bool:
@@ -177,6 +173,24 @@ class UserRepository(IUserRepository):
         return access_token
 
 
+    def decode_token(self, token: str, verify_exp: bool = True) -> dict:
+        """
+        This method is responsible for decoding a token, checking its signature.
+
+        Args:
+            token (str): The token.
+            verify_exp (bool): Whether an expired token is rejected.
+
+        Returns:
+            dict: The claims of the token.
+
+        Raises:
+            PyJWTError: If the token is invalid, or expired when verify_exp is True.
+        """
+
+        return jwt.decode(token, os.environ.get("SECRET_KEY"), algorithms=[os.environ.get("ALGORITHM")], options={"verify_exp": verify_exp})
+
+
     def authenticate(self, token: str) -> None:
         """
         This method is responsible for authenticating the user.
@@ -199,11 +213,11 @@ class UserRepository(IUserRepository):
             # Check if the token has expired
             expiry_time = payload.get("exp")
             if expiry_time is None or expiry_time < datetime.now().timestamp():
-                self.activeSessionsEntityManager.delete_many({"email": email})
+                # The expired sessions are removed by the TTL index of the active sessions
                 raise HTTPException(status_code=401, detail="Authentication failed, invalid or expired token.")
 
             # Check if the email exists in the active sessions
-            session = self.activeSessionsEntityManager.find_one({"email": email})
+            session = self.find_active_session(email)
             if not session:
                 raise HTTPException(status_code=401, detail="User session not found.")
 
@@ -212,12 +226,15 @@ class UserRepository(IUserRepository):
             raise HTTPException(status_code=401, detail="Authentication failed, invalid or expired token.")
 
 
-    def register_token_in_session(self, token: str) -> None:
+    def register_token_in_session(self, token: str) -> ActiveSession:
         """
         This method is responsible for registering the token in the active sessions.
 
         Args:
             token (str): The token.
+
+        Returns:
+            ActiveSession: The registered session.
         """
 
         try:
@@ -226,7 +243,8 @@ class UserRepository(IUserRepository):
 
             # Get the email and expiry time from the token
             user_email, expiration_time = payload.get("sub"), payload.get("exp")
-            expiration_datetime = datetime.fromtimestamp(expiration_time)
+            # Stored in UTC, as the TTL index of the active sessions expects
+            expiration_datetime = datetime.fromtimestamp(expiration_time, dt.UTC)
 
             # Create a new active session
             new_active_session = ActiveSession(
@@ -237,6 +255,7 @@ class UserRepository(IUserRepository):
 
             # Insert the active session in the database
             self.activeSessionsEntityManager.insert_one(new_active_session.model_dump())
+            return new_active_session
 
         except PyJWTError:
             # If there is an error in decoding the token, raise an exception
@@ -267,9 +286,24 @@ class UserRepository(IUserRepository):
             bool: False if the session is not active.
         """
 
+        return self.get_session_expiry(email) is not None
+
+
+    def get_session_expiry(self, email: str) -> float | None:
+        """
+        This method is responsible for getting the expiry of the active session of the user, if its token is still valid.
+
+        Args:
+            email (str): The email.
+
+        Returns:
+            float: The "exp" claim of the token of the session, as a unix timestamp.
+            None: None if the session is not active.
+        """
+
         # First, check if the user has an active session
-        existing_session = self.activeSessionsEntityManager.find_one({"email": email})
-        if not existing_session: return False
+        existing_session = self.find_active_session(email)
+        if not existing_session: return None
 
         # If an active session exists, check if the token is still valid
         try:
@@ -281,16 +315,32 @@ class UserRepository(IUserRepository):
             current_time = datetime.now().timestamp()
 
             if expiry_time is None or expiry_time < current_time:
-                # Token has expired
-                self.activeSessionsEntityManager.delete_many({"email": email})
-                return False
+                # Token has expired, the TTL index of the active sessions removes the session
+                return None
 
         except PyJWTError:
-            # There was an error in processing the token, delete the session and return false as session is no longer active.
+            # There was an error in processing the token, delete the session and return None as session is no longer active.
+            # The TTL index cannot remove it on time, its expiry comes from a token that cannot be trusted.
             self.activeSessionsEntityManager.delete_many({"email": email})
-            return False
+            return None
+
+        return expiry_time
+
+
+    def find_active_session(self, email: str) -> Any:
+        """
+        This method is responsible for finding a session of the user that has not expired yet.
+
+        Args:
+            email (str): The email.
+
+        Returns:
+            dict: The active session.
+            None: None if the user has no active session.
+        """
 
-        return True
+        # The TTL monitor only runs every minute, so the expired sessions not removed yet are skipped
+        return self.activeSessionsEntityManager.find_one({"email": email, "expiry_time": {"$gt": datetime.now(dt.UTC)}})
 
 
     def get_access_token_from_active_session(self, email: str) -> str:
@@ -305,7 +355,7 @@ class UserRepository(IUserRepository):
         """
 
         # Check if the user has an active session
-        existing_session = self.activeSessionsEntityManager.find_one({"email": email})
+        existing_session = self.find_active_session(email)
 
         # If the user has an active session, return the access token
         if existing_session is not None: return existing_session["access_token"]
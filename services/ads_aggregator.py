@@ -0,0 +1,237 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from services.result_cache import is_cacheable
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+def extract_ads(platform: str, response: dict) -> list[dict]:
+    """
+    This function is responsible for extracting the list of ads from an upstream response.
+
+    Args:
+        platform (str): The platform of the response ("facebook" or "tiktok").
+        response (dict): The JSON response of the API.
+
+    Returns:
+        list[dict]: The ads of the response (empty if the response is an error).
+    """
+
+    if not isinstance(response, dict):
+        return []
+
+    data = response.get("data") or []
+
+    # TikTok nests the ads under "data.ads"
+    if platform == "tiktok" and isinstance(data, dict):
+        return data.get("ads", [])
+
+    return data if isinstance(data, list) else []
+
+
+def get_ad_id(platform: str, ad: dict) -> str | None:
+    """
+    This function is responsible for getting the id of an ad.
+
+    Args:
+        platform (str): The platform of the ad ("facebook" or "tiktok").
+        ad (dict): The ad.
+
+    Returns:
+        str: The id of the ad, None if it has none.
+    """
+
+    if platform == "tiktok":
+        return (ad.get("ad") or {}).get("id")
+
+    return ad.get("id")
+
+
+def normalize_ad(platform: str, ad: dict) -> dict:
+    """
+    This function is responsible for converting a Facebook or TikTok ad to the common ad schema.
+
+    Args:
+        platform (str): The platform of the ad ("facebook" or "tiktok").
+        ad (dict): The ad, as returned by the API.
+
+    Returns:
+        dict: The ad with the "id", "platform", "page_id", "advertiser", "delivery_start", "delivery_stop",
+            "video_url", "image_urls" and "reached_countries" keys.
+    """
+
+    if platform == "tiktok":
+        details = ad.get("ad") or {}
+        advertiser = ad.get("advertiser") or {}
+        videos = details.get("videos") or []
+        return {
+            "id": details.get("id"),
+            "platform": platform,
+            "page_id": advertiser.get("business_id"),
+            "advertiser": advertiser.get("business_name"),
+            "delivery_start": details.get("first_shown_date"),
+            "delivery_stop": details.get("last_shown_date"),
+            "video_url": videos[0].get("url") if videos else None,
+            "image_urls": details.get("image_urls") or [],
+            "reached_countries": ad.get("reached_countries", [])
+        }
+
+    return {
+        "id": ad.get("id"),
+        "platform": platform,
+        "page_id": ad.get("page_id"),
+        "advertiser": ad.get("page_name"),
+        "delivery_start": ad.get("ad_delivery_start_time"),
+        "delivery_stop": ad.get("ad_delivery_stop_time"),
+        "video_url": ad.get("video_url"),
+        "image_urls": ad.get("image_urls", []),
+        "reached_countries": ad.get("reached_countries", [])
+    }
+
+
+class AdsAggregator:
+    """
+    This class is responsible for fanning out an ads search over several countries or platforms and merging the results.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        """
+        The constructor initializes the bounded thread pool used for the upstream calls.
+
+        Args:
+            max_workers (int): The maximum number of upstream calls made at the same time.
+        """
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ads-aggregator")
+
+        # The sources get their own pool, as each of them may fan out on the countries pool
+        self.sources_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ads-sources")
+
+
+    def fan_out(self, fetch: Callable[[str], dict], countries: list[str]) -> dict:
+        """
+        This method is responsible for calling the upstream API for every country in parallel.
+
+        Args:
+            fetch (Callable[[str], dict]): The function searching the ads of one country.
+            countries (list[str]): The countries.
+
+        Returns:
+            dict: The response of every country, keyed by country.
+        """
+
+        futures = {country: self.executor.submit(fetch, country) for country in countries}
+
+        responses = {}
+        for country, future in futures.items():
+            try:
+                responses[country] = future.result()
+            except Exception as e:
+                responses[country] = {"error": str(e)}
+
+        return responses
+
+
+    def search_sources(self, fetchers: dict, timeout: float) -> dict:
+        """
+        This method is responsible for querying several platforms at the same time, within a shared deadline.
+
+        Args:
+            fetchers (dict): The function searching the ads of each platform, keyed by platform.
+            timeout (float): The number of seconds after which the unfinished platforms are given up.
+
+        Returns:
+            dict: The normalized ads of all the finished platforms under "data", the status of each platform
+                under "sources" and the platforms that did not answer in time under "timed_out".
+        """
+
+        futures = {self.sources_executor.submit(fetch): platform for platform, fetch in fetchers.items()}
+        done, not_done = wait(futures, timeout=timeout)
+
+        data = []
+        sources = {}
+
+        for future in not_done:
+            # The call keeps running in the background, its result is simply not awaited
+            future.cancel()
+            sources[futures[future]] = {"status": "timeout"}
+
+        for future in done:
+            platform = futures[future]
+            try:
+                response = future.result()
+            except Exception as e:
+                sources[platform] = {"status": "error", "error": str(e)}
+                continue
+
+            if not is_cacheable(response):
+                sources[platform] = {"status": "error", "error": response.get("error") if isinstance(response, dict) else "No response."}
+                continue
+
+            ads = extract_ads(platform, response)
+            data.extend(normalize_ad(platform, ad) for ad in ads)
+            sources[platform] = {"status": "ok", "count": len(ads)}
+
+            # A merged multi-country response also reports the failed countries
+            if response.get("errors"):
+                sources[platform]["errors"] = response["errors"]
+
+        return {
+            "data": data,
+            "sources": sources,
+            "timed_out": sorted(platform for platform, source in sources.items() if source["status"] == "timeout")
+        }
+
+
+    def merge(self, platform: str, responses: dict) -> dict:
+        """
+        This method is responsible for merging the responses of several countries, deduplicating the ads by id.
+
+        Args:
+            platform (str): The platform of the responses ("facebook" or "tiktok").
+            responses (dict): The response of every country, keyed by country.
+
+        Returns:
+            dict: The merged ads under "data" ("data.ads" for TikTok, like a TikTok response), each with its "reached_countries",
+                and the failed countries under "errors".
+        """
+
+        merged = {}
+        errors = {}
+        has_more = False
+
+        for country, response in responses.items():
+            if not is_cacheable(response):
+                errors[country] = response.get("error") if isinstance(response, dict) else "No response."
+                continue
+
+            if platform == "tiktok":
+                has_more = has_more or bool((response.get("data") or {}).get("has_more"))
+
+            for ad in extract_ads(platform, response):
+                ad_id = get_ad_id(platform, ad)
+                key = ad_id if ad_id is not None else id(ad)
+
+                if key not in merged:
+                    # The upstream responses may be cached, so the ads are copied before being annotated
+                    merged[key] = dict(ad, reached_countries=[])
+                merged[key]["reached_countries"].append(country)
+
+        if platform == "tiktok":
+            return {
+                "data": {"ads": list(merged.values()), "has_more": has_more},
+                "error": {"code": "ok"},
+                "errors": errors
+            }
+
+        return {"data": list(merged.values()), "errors": errors}
+
+
+# Instantiate the ads aggregator shared by all the requests
+ads_aggregator = AdsAggregator(max_workers=int(os.getenv("FAN_OUT_MAX_WORKERS", 4)))
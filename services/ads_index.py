@@ -0,0 +1,276 @@
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from services.ads_aggregator import extract_ads, get_ad_id, normalize_ad
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# The text fields of the ads that are indexed when the response has them. The searches only request the fields the users
+# ask for, so an ad is always searchable by its search terms and advertiser name (page_name), but by its creative texts
+# only if they were among the requested fields
+TEXT_FIELDS = {
+    "facebook": ("page_name", "bylines", "ad_creative_bodies", "ad_creative_link_titles", "ad_creative_link_descriptions", "ad_creative_link_captions"),
+    "tiktok": ()
+}
+
+
+def tokenize(text: str | list | None) -> list[str]:
+    """
+    This function is responsible for splitting a text, or a list of texts, into lower case terms.
+
+    Args:
+        text (str | list): The text(s).
+
+    Returns:
+        list[str]: The terms, in order.
+    """
+
+    if not text:
+        return []
+
+    if isinstance(text, list):
+        return [term for part in text if isinstance(part, str) for term in tokenize(part)]
+
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def normalize_date(value: str | int | None) -> str | None:
+    """
+    This function is responsible for converting a Facebook ("2024-04-08") or TikTok (20240408) date to a comparable string.
+
+    Args:
+        value (str | int): The date.
+
+    Returns:
+        str: The "YYYYMMDD" date, None if there is no date.
+    """
+
+    if not value:
+        return None
+
+    return str(value).replace("-", "")[:8]
+
+
+def contains(postings: array, doc_id: int) -> bool:
+    """
+    This function is responsible for checking whether a sorted posting list contains a document.
+
+    Args:
+        postings (array): The sorted document ids.
+        doc_id (int): The document id.
+
+    Returns:
+        bool: True if the document is in the list.
+    """
+
+    position = bisect_left(postings, doc_id)
+    return position < len(postings) and postings[position] == doc_id
+
+
+class AdsIndex:
+    """
+    This class is responsible for indexing the recently fetched ads in memory, so that the searches can be refined
+    (by keyword, page or delivery window) without calling the upstream APIs again.
+    """
+
+    def __init__(self, max_ads: int = 50000) -> None:
+        """
+        The constructor initializes the empty index.
+
+        Args:
+            max_ads (int): The maximum number of ads indexed, the least recently fetched ones are evicted first.
+        """
+
+        self.max_ads = max_ads
+
+        # The document ids only grow, so that every posting list stays sorted by appending
+        self.next_doc_id = 0
+        self.documents = OrderedDict()
+        self.doc_ids = {}
+        self.postings = {}
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+
+    def add_response(self, platform: str, response: dict, search_term: str | None = None) -> int:
+        """
+        This method is responsible for indexing the ads of an upstream response.
+
+        Args:
+            platform (str): The platform of the response ("facebook" or "tiktok").
+            response (dict): The JSON response of the API.
+            search_term (str): The search term the ads were found with, indexed along with their text.
+
+        Returns:
+            int: The number of ads indexed.
+        """
+
+        ads = extract_ads(platform, response)
+        search_terms = tokenize(search_term)
+
+        with self.lock:
+            for ad in ads:
+                self.add(platform, ad, search_terms)
+
+        return len(ads)
+
+
+    def add(self, platform: str, ad: dict, search_terms: list[str]) -> None:
+        """
+        This method is responsible for indexing an ad, replacing its previous version. It must be called with the lock held.
+
+        Args:
+            platform (str): The platform of the ad.
+            ad (dict): The ad, as returned by the API.
+            search_terms (list[str]): The terms of the search the ad was found with.
+        """
+
+        ad_id = get_ad_id(platform, ad)
+        if ad_id is None:
+            return
+
+        key = (platform, ad_id)
+        normalized = normalize_ad(platform, ad)
+
+        terms = set(search_terms)
+        terms.update(tokenize(normalized["advertiser"]))
+        for field in TEXT_FIELDS[platform]:
+            terms.update(tokenize(ad.get(field)))
+
+        if key in self.doc_ids:
+            # The previous version keeps the terms of the other searches the ad was found with
+            terms.update(self.documents[self.doc_ids[key]][1])
+            self.remove(self.doc_ids[key])
+
+        terms.add(f"platform:{platform}")
+        if normalized["page_id"]:
+            terms.add(f"page:{normalized['page_id']}")
+
+        doc_id = self.next_doc_id
+        self.next_doc_id += 1
+
+        self.documents[doc_id] = (key, tuple(terms), normalized)
+        self.doc_ids[key] = doc_id
+        for term in terms:
+            self.postings.setdefault(term, array("I")).append(doc_id)
+
+        while len(self.documents) > self.max_ads:
+            self.remove(next(iter(self.documents)))
+            self.evictions += 1
+
+
+    def remove(self, doc_id: int) -> None:
+        """
+        This method is responsible for removing a document from the index. It must be called with the lock held.
+
+        Args:
+            doc_id (int): The document id.
+        """
+
+        key, terms, _ = self.documents.pop(doc_id)
+        del self.doc_ids[key]
+
+        for term in terms:
+            postings = self.postings[term]
+            # The evicted documents are the oldest ones, at the start of the lists
+            del postings[bisect_left(postings, doc_id)]
+            if not postings:
+                del self.postings[term]
+
+
+    def search(
+            self,
+            query: str | None = None,
+            platform: str | None = None,
+            page_id: str | None = None,
+            date_min: str | None = None,
+            date_max: str | None = None,
+            limit: int = 100
+        ) -> dict:
+        """
+        This method is responsible for finding the indexed ads matching all the terms and filters.
+
+        Args:
+            query (str): The terms the ads must all contain, in the search terms they were found with, their advertiser name or
+                the text fields of TEXT_FIELDS that were requested with them (default is any ad).
+            platform (str): The platform of the ads (default is both).
+            page_id (str): The page (or TikTok business) id of the ads (default is any page).
+            date_min (str): The date ("YYYY-MM-DD" or "YYYYMMDD") the ads must have been delivered until at least.
+            date_max (str): The date the ads must have started being delivered by.
+            limit (int): The maximum number of ads returned.
+
+        Returns:
+            dict: The normalized ads under "data", most recently fetched first, and whether there are more matches under "has_more".
+        """
+
+        terms = set(tokenize(query))
+        if platform:
+            terms.add(f"platform:{platform.lower()}")
+        if page_id:
+            terms.add(f"page:{page_id}")
+
+        date_min = normalize_date(date_min)
+        date_max = normalize_date(date_max)
+
+        with self.lock:
+            if terms:
+                postings = [self.postings.get(term) for term in terms]
+                if not all(postings):
+                    return {"data": [], "has_more": False}
+
+                # The shortest list is walked, the others are only looked up in
+                postings.sort(key=len)
+                candidates = (doc_id for doc_id in reversed(postings[0]) if all(contains(other, doc_id) for other in postings[1:]))
+            else:
+                candidates = reversed(self.documents)
+
+            data = []
+            for doc_id in candidates:
+                ad = self.documents[doc_id][2]
+
+                start = normalize_date(ad["delivery_start"])
+                stop = normalize_date(ad["delivery_stop"])
+                if date_max and start and start > date_max:
+                    continue
+                # An ad without a stop date is still being delivered
+                if date_min and stop and stop < date_min:
+                    continue
+
+                # The walk stops at the first match past the limit, whatever the number of matches
+                if len(data) == limit:
+                    return {"data": data, "has_more": True}
+
+                data.append(ad)
+
+        return {"data": data, "has_more": False}
+
+
+    def stats(self) -> dict:
+        """
+        This method is responsible for returning the size of the index.
+
+        Returns:
+            dict: The number of ads, terms, postings and evictions.
+        """
+
+        with self.lock:
+            return {
+                "ads": len(self.documents),
+                "terms": len(self.postings),
+                "postings": sum(len(postings) for postings in self.postings.values()),
+                "evictions": self.evictions
+            }
+
+
+# Instantiate the index of the ads fetched by the application
+ads_index = AdsIndex(max_ads=int(os.getenv("ADS_INDEX_MAX_ADS", 50000)))
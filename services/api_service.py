@@ -1,9 +1,28 @@
+import datetime
+import json
+import os
+from typing import Iterator
+
 from fastapi import HTTPException, status
 
 from ads_apis.facebook import FacebookAPI
-from ads_apis.tiktok import TikTokAPI
-from repositories.UserRepository import UserRepository
-import requests
+from ads_apis.tiktok import DateRange, TikTokAPI
+from repositories.AdsCatalogRepository import AdsCatalogRepository
+from services.ads_aggregator import ads_aggregator
+from services.ads_index import ads_index
+from services.catalog_sync import catalog_sync
+from services.creative_dedup import CREATIVE_TEXT_FIELDS, CreativeDeduplicator, dedup_response
+from services.media_cache import creative_cache
+from services.prefetch_scheduler import prefetch_scheduler
+from services.projection import parse_fields, trim_ad, trim_response
+from services.result_cache import ads_cache
+from services.singleflight import upstream_flight
+from services.snapshot_enricher import snapshot_enricher
+from services.tiktok_planner import tiktok_planner
+from services.user_service import UserService
+
+# Number of seconds a search waits for the creative texts of its ads, the ads missing them are served without them
+CREATIVE_LOOKUP_TIMEOUT = float(os.getenv("CREATIVE_LOOKUP_TIMEOUT", 2))
 
 
 class ApiService:
@@ -13,49 +32,427 @@ class ApiService:
 
     def __init__(self) -> None:
         """
-        The constructor initializes the user repository.
+        The constructor initializes the ads API clients and the user service.
         """
 
         self.facebook_ads_api = FacebookAPI()
         self.tiktok_ads_api = TikTokAPI()
-        self.user_repository = UserRepository()
+        self.user_service = UserService()
+        self.ads_catalog_repository = AdsCatalogRepository()
 
-    def facebook_ads(self, email: str, search_term: str = "dropshipping", country: str = "us") -> dict:
+    def facebook_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: str | list[str] = "us",
+            from_catalog: bool = False,
+            fields: str | None = None,
+            dedup: bool = False,
+            token: str | None = None
+        ) -> dict:
         """
         This method is responsible for fetching the Facebook ads data based on the search term and country.
 
+        Args:
+            email (str): The email of the user.
+            search_term (str): The search term for the ads.
+            country (str | list[str]): The country name(s) to filter the ads.
+            from_catalog (bool): Whether the ads are read from the local ads catalog instead of the Facebook Ads API, when the
+                catalog sync is enabled and has completed for the search (the Facebook Ads API is used otherwise).
+            fields (str): The comma separated Graph API fields of the ads to return (default is all the fields).
+            dedup (bool): Whether only one ad per creative is returned, with the number and ids of the ads showing it.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
+
+        Returns:
+            dict: The JSON response from the API endpoint (containing the Facebook ads data), merged across countries if there are several.
+        """
+
+        is_session_active = self.user_service.is_session_active(email, token)
+
+        if not is_session_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is not active.")
+
+        response = self.catalog_ads(search_term, country) if from_catalog else None
+
+        if response is None:
+            response = self.search_countries("facebook", search_term, country, fields)
+
+        if dedup:
+            if isinstance(response, dict) and isinstance(response.get("data"), list):
+                response = dict(response, data=self.resolve_creatives(response["data"]))
+            response = dedup_response("facebook", response)
+
+        return trim_response(response, fields)
+
+    def catalog_ads(self, search_term: str, country: str | list[str]) -> dict | None:
+        """
+        This method is responsible for reading the Facebook ads of a search from the local ads catalog.
+
+        Args:
+            search_term (str): The search term for the ads.
+            country (str | list[str]): The country name(s), as a list or comma separated.
+
+        Returns:
+            dict: The catalog ads under "data", most recent first.
+            None: None if the catalog sync is disabled or has not completed for any of the countries yet.
+        """
+
+        if not catalog_sync.enabled:
+            return None
+
+        countries = self.parse_countries(country)
+
+        # The search is kept up to date by the catalog sync from now on
+        for code in countries:
+            catalog_sync.track(search_term, code, self.ads_catalog_repository)
+
+        # An empty catalog is not an empty search, the search is only served from the catalog once synced
+        synced = self.ads_catalog_repository.get_synced_countries(search_term.strip(), countries)
+        if not synced:
+            return None
+
+        return {"data": self.ads_catalog_repository.find_ads(search_term.strip(), synced)}
+
+    def resolve_creatives(self, ads: list[dict]) -> list[dict]:
+        """
+        This method is responsible for adding the creative texts to the Facebook ads fetched without them, so that their
+        creatives can be told apart. The texts are cached by ad id, and the lookups of the uncached ads are batched with the
+        lookups of the other requests.
+
+        Args:
+            ads (list[dict]): The Facebook ads (shared with the cache, they are not modified).
+
+        Returns:
+            list[dict]: The ads, copied with their "ad_creative_*" fields when they were missing and could be looked up.
+        """
+
+        missing = [ad["id"] for ad in ads if ad.get("id") and not any(field in ad for field in CREATIVE_TEXT_FIELDS)]
+        if not missing:
+            return ads
+
+        creatives = creative_cache.get_many(missing)
+        uncached = [ad_id for ad_id in missing if ad_id not in creatives]
+
+        if uncached:
+            for ad_id, creative in self.facebook_ads_api.get_objects(uncached, ",".join(CREATIVE_TEXT_FIELDS), CREATIVE_LOOKUP_TIMEOUT).items():
+                # The failed and timed out lookups are not cached, the next search retries them
+                if "error" in creative:
+                    continue
+                creatives[ad_id] = {field: creative[field] for field in CREATIVE_TEXT_FIELDS if field in creative}
+                creative_cache.set(ad_id, creatives[ad_id])
+
+        resolved = []
+        for ad in ads:
+            creative = creatives.get(ad.get("id"))
+            if creative:
+                ad = dict(ad, **creative)
+            resolved.append(ad)
+
+        return resolved
+
+    def parse_countries(self, country: str | list[str]) -> list[str]:
+        """
+        This method is responsible for converting the country parameter to a list of unique upper case country codes.
+
+        Args:
+            country (str | list[str]): The country name(s), as a list or comma separated.
+
+        Returns:
+            list[str]: The country codes (["US"] if none is given).
+        """
+
+        countries = []
+        for value in ([country] if isinstance(country, str) else country):
+            for code in value.split(","):
+                if code.strip() and code.strip().upper() not in countries:
+                    countries.append(code.strip().upper())
+
+        return countries or ["US"]
+
+    def stream_facebook_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: str = "us",
+            max_ads: int = 100,
+            fields: str | None = None,
+            dedup: bool = False,
+            token: str | None = None
+        ) -> Iterator[str]:
+        """
+        This method is responsible for streaming the Facebook ads as NDJSON, following the pagination as the pages arrive.
+
         Args:
             email (str): The email of the user.
             search_term (str): The search term for the ads.
             country (str): The country name to filter the ads.
+            max_ads (int): The maximum number of ads to stream.
+            fields (str): The comma separated Graph API fields of the ads to return (default is all the fields).
+            dedup (bool): Whether only the first ad of each creative is streamed, followed by a last line listing the
+                "creatives" shown by several ads.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
 
         Returns:
-            dict: The JSON response from the API endpoint (containing the Facebook ads data).
+            Iterator[str]: The NDJSON lines, one per ad, or a last line with the error of a failed page.
         """
 
-        is_session_active = self.user_repository.is_session_active(email)
+        is_session_active = self.user_service.is_session_active(email, token)
 
         if not is_session_active:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is not active.")
 
-        return self.facebook_ads_api.get_ads(search_term, country)
+        def generate() -> Iterator[str]:
+            streamed = 0
+            paths = parse_fields(fields)
+            deduplicator = CreativeDeduplicator("facebook") if dedup else None
+            try:
+                for page in self.facebook_ads_api.iter_pages(search_term, country, max_ads, fields=fields):
+                    if not page or "data" not in page:
+                        yield json.dumps({"error": page.get("error") if page else "Facebook access key is not set."}) + "\n"
+                        return
+
+                    ads_index.add_response("facebook", page, search_term)
+
+                    ads = page["data"][:max_ads - streamed]
+                    if deduplicator is not None:
+                        ads = self.resolve_creatives(ads)
+
+                    for ad in ads:
+                        streamed += 1
+                        # The duplicates are only counted, the ads are not kept
+                        if deduplicator is not None and deduplicator.add(ad) is None:
+                            continue
+                        yield json.dumps(trim_ad(ad, paths)) + "\n"
+            except Exception as e:
+                # The status line is already sent, the failure is reported as the last line instead
+                yield json.dumps({"error": str(e)}) + "\n"
+                return
+
+            if deduplicator is not None:
+                yield json.dumps({"creatives": deduplicator.duplicates()}) + "\n"
+
+        # The session is checked before the response starts, the pages are only fetched while streaming
+        return generate()
+
+    def search_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: str | list[str] = "us",
+            timeout: float = 5.0,
+            token: str | None = None
+        ) -> dict:
+        """
+        This method is responsible for searching the Facebook and TikTok ads at the same time, within a shared deadline.
+
+        Args:
+            email (str): The email of the user.
+            search_term (str): The search term for the ads.
+            country (str | list[str]): The country name(s) to filter the ads.
+            timeout (float): The number of seconds after which the platforms that have not answered are left out.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
+
+        Returns:
+            dict: The normalized ads of the platforms that answered in time, the status of each platform and the timed out ones.
+        """
+
+        is_session_active = self.user_service.is_session_active(email, token)
+
+        if not is_session_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is not active.")
+
+        return ads_aggregator.search_sources(
+            {
+                "facebook": lambda: self.search_countries("facebook", search_term, country),
+                "tiktok": lambda: self.search_countries("tiktok", search_term, country)
+            },
+            timeout
+        )
+
+    def search_countries(
+            self,
+            platform: str,
+            search_term: str,
+            country: str | list[str],
+            fields: str | None = None,
+            date_range: DateRange | None = None
+        ) -> dict:
+        """
+        This method is responsible for searching the ads of one or several countries, in parallel.
+
+        Args:
+            platform (str): The platform to search ("facebook" or "tiktok").
+            search_term (str): The search term for the ads.
+            country (str | list[str]): The country name(s), as a list or comma separated.
+            fields (str): The comma separated fields of the ads to request (default is the API default fields).
+            date_range (DateRange): The TikTok publication date range, fetched as parallel shards (default is the API client default).
+
+        Returns:
+            dict: The upstream response for a single country, or the ads merged by id with their "reached_countries".
+        """
+
+        if platform == "facebook":
+            get_ads = lambda code: self.get_facebook_ads(search_term, code, fields)
+        else:
+            get_ads = lambda code: self.get_tiktok_ads(search_term, code, fields, date_range)
+
+        countries = self.parse_countries(country)
+
+        if len(countries) == 1:
+            return get_ads(countries[0])
+
+        responses = ads_aggregator.fan_out(get_ads, countries)
+        return ads_aggregator.merge(platform, responses)
+
+    def get_facebook_ads(self, search_term: str, country: str, fields: str | None = None) -> dict:
+        """
+        This method is responsible for fetching the Facebook ads through the results cache.
+
+        Args:
+            search_term (str): The search term for the ads.
+            country (str): The country name to filter the ads.
+            fields (str): The comma separated fields of the ads to request (default is the API default fields).
+
+        Returns:
+            dict: The cached or fresh JSON response from the Facebook Ads API.
+        """
+
+        key = (search_term.strip(), country.upper())
+
+        if fields:
+            # Projected searches are cached apart, only the full ones are prefetched
+            key = key + (fields,)
+        else:
+            prefetch_scheduler.record("facebook", *key)
+
+        # Identical searches missing the cache at the same time share one upstream call
+        return ads_cache.get_or_load(
+            "facebook",
+            key,
+            lambda: upstream_flight.do(("facebook",) + key, lambda: self.fetch_ads("facebook", search_term, country, fields))
+        )
+
+    def get_tiktok_ads(self, search_term: str, country: str, fields: str | None = None, date_range: DateRange | None = None) -> dict:
+        """
+        This method is responsible for fetching the TikTok ads through the results cache.
+
+        Args:
+            search_term (str): The search term for the ads.
+            country (str): The country name to filter the ads.
+            fields (str): The comma separated fields of the ads to request (default is the API default fields).
+            date_range (DateRange): The publication date range, fetched as parallel shards (default is the API client default).
+
+        Returns:
+            dict: The cached or fresh JSON response from the TikTok Ads API.
+        """
+
+        key = (search_term.strip(), country.upper())
+
+        if date_range is not None:
+            # Historical pulls are cached apart and never prefetched
+            key = key + (fields, date_range.min, date_range.max)
+        elif fields:
+            # Projected searches are cached apart, only the full ones are prefetched
+            key = key + (fields,)
+        else:
+            prefetch_scheduler.record("tiktok", *key)
+
+        # Identical searches missing the cache at the same time share one upstream call
+        return ads_cache.get_or_load(
+            "tiktok",
+            key,
+            lambda: upstream_flight.do(("tiktok",) + key, lambda: self.fetch_ads("tiktok", search_term, country, fields, date_range))
+        )
+
+    def fetch_ads(
+            self,
+            platform: str,
+            search_term: str,
+            country: str,
+            fields: str | None = None,
+            date_range: DateRange | None = None
+        ) -> dict:
+        """
+        This method is responsible for fetching the ads from the upstream API and indexing them for the refinements.
+
+        Args:
+            platform (str): The platform to search ("facebook" or "tiktok").
+            search_term (str): The search term for the ads.
+            country (str): The country name to filter the ads.
+            fields (str): The comma separated fields of the ads to request (default is the API default fields).
+            date_range (DateRange): The TikTok publication date range, fetched as parallel shards (default is the API client default).
+
+        Returns:
+            dict: The JSON response from the Facebook or TikTok Ads API.
+        """
+
+        if platform == "tiktok" and date_range is not None:
+            # Every shard follows its own search cursor, the pages of a shard are fetched in sequence
+            response = tiktok_planner.fetch(
+                lambda shard, search_id, max_count: self.tiktok_ads_api.get_ads(search_term, country, shard, fields, search_id, max_count),
+                date_range
+            )
+        else:
+            api = self.facebook_ads_api if platform == "facebook" else self.tiktok_ads_api
+            response = api.get_ads(search_term, country, fields=fields)
+
+        ads_index.add_response(platform, response, search_term)
+
+        return response
+
+    def refine_ads(
+            self,
+            email: str,
+            query: str | None = None,
+            platform: str | None = None,
+            page_id: str | None = None,
+            date_min: str | None = None,
+            date_max: str | None = None,
+            limit: int = 100,
+            token: str | None = None
+        ) -> dict:
+        """
+        This method is responsible for refining the searches over the ads already fetched, without calling the upstream APIs.
+
+        Args:
+            email (str): The email of the user.
+            query (str): The keywords the ads must all contain, in the search terms they were found with or their advertiser
+                name, and in their creative texts if they were requested (default is any ad).
+            platform (str): The platform of the ads ("facebook" or "tiktok", default is both).
+            page_id (str): The page (or TikTok business) id of the ads (default is any page).
+            date_min (str): The date the ads must have been delivered until at least.
+            date_max (str): The date the ads must have started being delivered by.
+            limit (int): The maximum number of ads returned.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
+
+        Returns:
+            dict: The normalized matching ads under "data" and whether there are more of them under "has_more".
+        """
+
+        is_session_active = self.user_service.is_session_active(email, token)
+
+        if not is_session_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is not active.")
+
+        return ads_index.search(query, platform, page_id, date_min, date_max, limit)
+
+    def cache_stats(self) -> dict:
+        """
+        This method is responsible for returning the counters of the ads results cache.
+
+        Returns:
+            dict: The hits, stale hits, misses, evictions, revalidations and fallbacks counters and the current size.
+        """
+
+        return ads_cache.stats()
     
     def test_facebook_ads(self,search_term, country) -> dict:
-        ads = self.facebook_ads_api.get_ads(search_term,country)
-        for ad in ads["data"]:
-            response = requests.get(ad["ad_snapshot_url"])
-            tokens = str(response.content).split('"')
-            try:
-                index = tokens.index("video_sd_url")
-            except ValueError as e:
-                print(e)
-                ad["video_url"] = None
-            else:
-                overslashed = tokens[index+2]
-                slashedIterable = overslashed.split("\\")
-                slashed = "".join(slashedIterable)
-                ad["video_url"] = slashed
-        return ads
+        # The cached response is shared, so the ads are copied before the video urls are added
+        ads = self.get_facebook_ads(search_term,country)
+        ads = dict(ads, data=[dict(ad) for ad in ads["data"]])
+        snapshot_enricher.enrich(ads["data"])
+        # The snapshot pages are fetched with our access token, it is removed once they are resolved
+        return trim_response(ads, None)
     
     def test_data(self) -> dict:
         return {
@@ -124,22 +521,56 @@ class ApiService:
             }
         }
     
-    def tiktok_ads(self, email: str, search_term: str = "dropshipping", country: str = "us") -> dict:
+    def tiktok_ads(
+            self,
+            email: str,
+            search_term: str = "dropshipping",
+            country: str | list[str] = "us",
+            fields: str | None = None,
+            dedup: bool = False,
+            date_min: str | None = None,
+            date_max: str | None = None,
+            token: str | None = None
+        ) -> dict:
         """
         This method is responsible for fetching the TikTok ads data based on the search term and country.
 
         Args:
             email (str): The email of the user.
             search_term (str): The search term for the ads.
-            country (str): The country name to filter the ads.
+            country (str | list[str]): The country name(s) to filter the ads.
+            fields (str): The comma separated TikTok fields of the ads to return (default is id, reach, videos, advertiser name and images).
+            dedup (bool): Whether only one ad per creative is returned, with the number and ids of the ads showing it.
+            date_min (str): The first publication date ("YYYYMMDD" or "YYYY-MM-DD") of the ads (default is the API client default range).
+            date_max (str): The last publication date of the ads (default is today), only with a date_min.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
 
         Returns:
-            dict: The JSON response from the API endpoint (containing the TikTok ads data).
+            dict: The JSON response from the API endpoint (containing the TikTok ads data), merged across countries if there are several.
         """
 
-        is_session_active = self.user_repository.is_session_active(email)
+        is_session_active = self.user_service.is_session_active(email, token)
 
         if not is_session_active:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session is not active.")
 
-        return self.tiktok_ads_api.get_ads(search_term, country)
+        if date_max and not date_min:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date range: date_max requires a date_min")
+
+        date_range = None
+        if date_min:
+            date_range = DateRange(date_min.replace("-", ""), (date_max or datetime.date.today().isoformat()).replace("-", ""))
+            try:
+                if datetime.datetime.strptime(date_range.min, "%Y%m%d") > datetime.datetime.strptime(date_range.max, "%Y%m%d"):
+                    raise ValueError("date_min is after date_max")
+                # The shards are only fetched once the request is known to be served
+                tiktok_planner.plan(date_range)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid date range: {e}")
+
+        response = self.search_countries("tiktok", search_term, country, fields, date_range)
+
+        if dedup:
+            response = dedup_response("tiktok", response)
+
+        return trim_response(response, fields)
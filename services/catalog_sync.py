@@ -0,0 +1,198 @@
+import datetime as dt
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from ads_apis.facebook import FacebookAPI
+from repositories.AdsCatalogRepository import AdsCatalogRepository
+from services.projection import strip_access_token
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSync:
+    """
+    This class is responsible for keeping the ads catalog up to date with the searches of the users, in the background.
+    The sync thread runs in every process, but only the process holding the sync lease in the database syncs the searches
+    tracked by all the processes.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = False,
+            interval: float = 900.0,
+            max_ads: int = 500,
+            max_queries: int = 200,
+            queries: list | None = None,
+            lease_seconds: float | None = None
+        ) -> None:
+        """
+        The constructor initializes the searches tracked by this process. The sync thread is only started by start().
+
+        Args:
+            enabled (bool): Whether the sync thread runs at all.
+            interval (float): The number of seconds between two syncs of the tracked searches.
+            max_ads (int): The maximum number of ads fetched per search and sync.
+            max_queries (int): The maximum number of searches tracked.
+            queries (list): The (search term, country) searches always tracked.
+            lease_seconds (float): The number of seconds after which another process takes over the sync if the one holding
+                the lease stopped renewing it (default is twice the interval).
+        """
+
+        self.enabled = enabled
+        self.interval = interval
+        self.max_ads = max_ads
+        self.max_queries = max_queries
+        self.queries = dict.fromkeys(queries or [])
+        self.lease_seconds = lease_seconds or 2 * interval
+        self.owner = uuid.uuid4().hex
+        self.tracked = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+
+    def track(self, search_term: str, country: str, repository: AdsCatalogRepository) -> None:
+        """
+        This method is responsible for adding a search to the searches kept up to date, for the process holding the sync lease.
+
+        Args:
+            search_term (str): The search term.
+            country (str): The country.
+            repository (AdsCatalogRepository): The ads catalog repository.
+        """
+
+        query = (search_term.strip(), country.upper())
+
+        with self.lock:
+            # The searches already stored by this process are not written again at every request
+            if query in self.tracked or len(self.tracked) >= self.max_queries:
+                return
+            self.tracked.add(query)
+
+        repository.track_search(*query)
+
+
+    def sync(self, search_term: str, country: str, facebook_ads_api: FacebookAPI, repository: AdsCatalogRepository) -> int:
+        """
+        This method is responsible for upserting the ads of a search delivered since its last sync.
+
+        Args:
+            search_term (str): The search term.
+            country (str): The country.
+            facebook_ads_api (FacebookAPI): The Facebook API client.
+            repository (AdsCatalogRepository): The ads catalog repository.
+
+        Returns:
+            int: The number of ads inserted or modified.
+        """
+
+        started_at = datetime.now(dt.UTC)
+        last_sync = repository.get_last_sync(search_term, country)
+
+        # Ads still running at the last sync have been delivered since the day before it
+        delivery_date_min = (last_sync - timedelta(days=1)).strftime("%Y-%m-%d") if last_sync else None
+
+        synced = 0
+        for page in facebook_ads_api.iter_pages(search_term, country, self.max_ads, page_size=100, delivery_date_min=delivery_date_min):
+            if not page or "data" not in page:
+                # The sync state is left untouched so that the next run covers the same window
+                return synced
+
+            # The snapshot urls are signed with our access token, which must never be stored nor served from the catalog
+            ads = [
+                dict(ad, ad_snapshot_url=strip_access_token(ad["ad_snapshot_url"])) if isinstance(ad.get("ad_snapshot_url"), str) else ad
+                for ad in page["data"]
+            ]
+
+            synced += repository.upsert_ads(ads, search_term, country)
+
+        repository.set_last_sync(search_term, country, started_at)
+        return synced
+
+
+    def run(self) -> None:
+        """
+        This method is run by the sync thread, syncing all the tracked searches every interval while this process holds the sync lease.
+        """
+
+        facebook_ads_api = FacebookAPI()
+        repository = AdsCatalogRepository()
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.sync_all(facebook_ads_api, repository)
+                except Exception:
+                    logger.exception("Could not sync the ads catalog")
+
+                self.stopped.wait(self.interval)
+        finally:
+            try:
+                repository.release_sync_lease(self.owner)
+            except Exception:
+                logger.exception("Could not release the ads catalog sync lease")
+
+
+    def sync_all(self, facebook_ads_api: FacebookAPI, repository: AdsCatalogRepository) -> None:
+        """
+        This method is responsible for syncing the searches tracked by all the processes, if this process holds the sync lease.
+
+        Args:
+            facebook_ads_api (FacebookAPI): The Facebook API client.
+            repository (AdsCatalogRepository): The ads catalog repository.
+        """
+
+        if not repository.acquire_sync_lease(self.owner, self.lease_seconds):
+            return
+
+        for search_term, country in self.queries:
+            self.track(search_term, country, repository)
+
+        for search_term, country in repository.get_tracked_searches(self.max_queries):
+            # The lease is renewed before every search, the sync stops as soon as another process took it over
+            if self.stopped.is_set() or not repository.acquire_sync_lease(self.owner, self.lease_seconds):
+                return
+            try:
+                self.sync(search_term, country, facebook_ads_api, repository)
+            except Exception:
+                logger.exception("Could not sync the ads catalog for %r in %s", search_term, country)
+
+
+    def start(self) -> None:
+        """
+        This method is responsible for starting the sync thread, if the sync is enabled.
+        """
+
+        if self.enabled and self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="catalog-sync", daemon=True)
+            self.thread.start()
+
+
+    def stop(self) -> None:
+        """
+        This method is responsible for stopping the sync thread after the search being synced.
+        """
+
+        self.stopped.set()
+
+
+# Instantiate the catalog sync shared by the application
+catalog_sync = CatalogSync(
+    enabled=os.getenv("CATALOG_SYNC_ENABLED", "false").lower() in ("1", "true", "yes"),
+    interval=float(os.getenv("CATALOG_SYNC_INTERVAL", 900)),
+    max_ads=int(os.getenv("CATALOG_SYNC_MAX_ADS", 500)),
+    lease_seconds=float(os.getenv("CATALOG_SYNC_LEASE_SECONDS", 0)) or None,
+    queries=[
+        (query.split(":")[0].strip(), query.split(":")[1].strip().upper())
+        for query in os.getenv("CATALOG_SYNC_QUERIES", "dropshipping:US").split(",") if ":" in query
+    ]
+)
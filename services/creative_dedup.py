@@ -0,0 +1,169 @@
+import hashlib
+import urllib.parse
+
+from services.ads_aggregator import get_ad_id, normalize_ad
+from services.media_cache import MediaCache, media_cache
+
+# The creative text fields of the Facebook ads, when they were requested
+CREATIVE_TEXT_FIELDS = ("ad_creative_bodies", "ad_creative_link_titles", "ad_creative_link_descriptions", "ad_creative_link_captions")
+
+
+def creative_fingerprint(platform: str, ad: dict, media: dict | None = None) -> bytes:
+    """
+    This function is responsible for hashing the creative of an ad: its page, media file and text.
+
+    Args:
+        platform (str): The platform of the ad ("facebook" or "tiktok").
+        ad (dict): The ad, as returned by the API (with its resolved "video_url" for Facebook).
+        media (dict): The "video_sd_url", "video_hd_url" and "image_urls" resolved for the ad, used when the ad has no
+            "video_url" of its own (default is none).
+
+    Returns:
+        bytes: The 16 bytes fingerprint, the same for all the ads showing the same creative.
+    """
+
+    normalized = normalize_ad(platform, ad)
+    media = (
+        [normalized["video_url"]] + list(normalized["image_urls"])
+        if normalized["video_url"] or media is None
+        else [media["video_sd_url"] or media["video_hd_url"]] + list(media["image_urls"])
+    )
+    texts = [text for field in CREATIVE_TEXT_FIELDS for text in (ad.get(field) or []) if isinstance(text, str)]
+
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update(f"{platform}\0{normalized['page_id']}\0".encode())
+
+    if not any(media) and not texts:
+        # Nothing tells the creative apart, the ad is only a duplicate of itself
+        fingerprint.update(f"id\0{normalized['id']}".encode())
+        return fingerprint.digest()
+
+    for url in media:
+        if url:
+            # The signature parameters of the CDN urls change on every fetch, the file path does not
+            fingerprint.update(f"media\0{urllib.parse.urlsplit(url).path}\0".encode())
+
+    for text in texts:
+        fingerprint.update(f"text\0{text.strip()}\0".encode())
+
+    return fingerprint.digest()
+
+
+class CreativeDeduplicator:
+    """
+    This class is responsible for grouping the ads showing the same creative, as they come.
+    """
+
+    def __init__(self, platform: str, max_ids: int = 100, media_cache: MediaCache = media_cache) -> None:
+        """
+        The constructor initializes the empty groups.
+
+        Args:
+            platform (str): The platform of the ads ("facebook" or "tiktok").
+            max_ids (int): The maximum number of ids listed per creative, the others are only counted.
+            media_cache (MediaCache): The cache of the media urls already resolved, per ad, for the Facebook ads fetched
+                without their "video_url".
+        """
+
+        self.platform = platform
+        self.max_ids = max_ids
+        self.media_cache = media_cache
+
+        # Only the fixed size fingerprints, the counts and at most max_ids ids per creative are kept, never the ads
+        self.groups = {}
+
+
+    def add(self, ad: dict) -> dict | None:
+        """
+        This method is responsible for adding an ad to the group of its creative.
+
+        Args:
+            ad (dict): The ad.
+
+        Returns:
+            dict: The group ({"id", "count", "ids"}) if the ad is the first of its creative, None if it is a duplicate.
+        """
+
+        ad_id = get_ad_id(self.platform, ad)
+
+        # The snapshot pages are not fetched here, only the media already resolved for the ad is used
+        media = None
+        if self.platform == "facebook" and not ad.get("video_url") and ad_id is not None:
+            media = self.media_cache.get(ad_id)
+
+        fingerprint = creative_fingerprint(self.platform, ad, media)
+
+        group = self.groups.get(fingerprint)
+        if group is not None:
+            group["count"] += 1
+            if len(group["ids"]) < self.max_ids:
+                group["ids"].append(ad_id)
+            return None
+
+        group = {"id": ad_id, "count": 1, "ids": [ad_id]}
+        self.groups[fingerprint] = group
+        return group
+
+
+    def duplicates(self) -> list[dict]:
+        """
+        This method is responsible for listing the creatives shown by several ads.
+
+        Returns:
+            list[dict]: The group of each creative with duplicates, in the order they were first seen.
+        """
+
+        return [group for group in self.groups.values() if group["count"] > 1]
+
+
+def dedup_ads(platform: str, ads: list[dict], media_cache: MediaCache = media_cache) -> list[dict]:
+    """
+    This function is responsible for keeping one ad per creative, with the number and the ids of the ads showing it.
+
+    Args:
+        platform (str): The platform of the ads ("facebook" or "tiktok").
+        ads (list[dict]): The ads.
+        media_cache (MediaCache): The cache of the media urls already resolved, per ad.
+
+    Returns:
+        list[dict]: The first ad of each creative, copied with its "creative_count" and "creative_ids".
+    """
+
+    deduplicator = CreativeDeduplicator(platform, media_cache=media_cache)
+    representatives = []
+
+    for ad in ads:
+        group = deduplicator.add(ad)
+        if group is not None:
+            representatives.append((ad, group))
+
+    # The groups are complete once all the ads are seen
+    return [dict(ad, creative_count=group["count"], creative_ids=group["ids"]) for ad, group in representatives]
+
+
+def dedup_response(platform: str, response: dict, media_cache: MediaCache = media_cache) -> dict:
+    """
+    This function is responsible for deduplicating the ads of a Facebook, TikTok or merged response by creative.
+
+    Args:
+        platform (str): The platform of the response ("facebook" or "tiktok").
+        response (dict): The response (shared with the cache, it is not modified).
+        media_cache (MediaCache): The cache of the media urls already resolved, per ad.
+
+    Returns:
+        dict: A copy of the response with one ad per creative.
+    """
+
+    if not isinstance(response, dict):
+        return response
+
+    data = response.get("data")
+
+    if isinstance(data, list):
+        return dict(response, data=dedup_ads(platform, data, media_cache))
+
+    if isinstance(data, dict) and isinstance(data.get("ads"), list):
+        # TikTok nests the ads under "data.ads"
+        return dict(response, data=dict(data, ads=dedup_ads(platform, data["ads"], media_cache)))
+
+    return response
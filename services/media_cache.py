@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+def get_signed_url_expiry(url: str) -> float | None:
+    """
+    This function is responsible for reading the expiry of a signed fbcdn url from its hex "oe" parameter.
+
+    Args:
+        url (str): The media url (e.g. "...mp4?...&oe=665FAB90").
+
+    Returns:
+        float: The expiry as a unix timestamp.
+        None: None if the url is not signed.
+    """
+
+    values = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("oe")
+    if not values:
+        return None
+
+    try:
+        return float(int(values[0], 16))
+    except ValueError:
+        return None
+
+
+class MediaCache:
+    """
+    This class is responsible for caching the media urls resolved for each ad until their signature expires.
+    """
+
+    def __init__(self, max_entries: int = 10000, safety_margin: float = 600.0, default_ttl: float = 3600.0, database_path: str | None = None) -> None:
+        """
+        The constructor initializes the in-memory tier and, if a path is given, the disk tier.
+
+        Args:
+            max_entries (int): The maximum number of ads kept in memory.
+            safety_margin (float): The number of seconds before the signature expiry after which an entry is no longer served.
+            default_ttl (float): The number of seconds an entry without signed urls is kept.
+            database_path (str): The path of the SQLite file of the disk tier (default is no disk tier).
+        """
+
+        self.max_entries = max_entries
+        self.safety_margin = safety_margin
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.database = None
+
+        if database_path:
+            self.database = sqlite3.connect(database_path, check_same_thread=False)
+            self.database.execute("CREATE TABLE IF NOT EXISTS media (ad_id TEXT PRIMARY KEY, expires_at REAL, media TEXT)")
+            self.database.execute("CREATE INDEX IF NOT EXISTS media_expires_at ON media (expires_at)")
+            self.database.commit()
+
+
+    def get(self, ad_id: str) -> dict | None:
+        """
+        This method is responsible for getting the media urls of an ad, if they are still valid.
+
+        Args:
+            ad_id (str): The id of the ad.
+
+        Returns:
+            dict: The "video_sd_url", "video_hd_url" and "image_urls" of the ad.
+            None: None if the ad is not cached or its urls are about to expire.
+        """
+
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(ad_id)
+            if entry is not None:
+                if now < entry[0]:
+                    self.entries.move_to_end(ad_id)
+                    return entry[1]
+                del self.entries[ad_id]
+
+            if self.database is None:
+                return None
+
+            row = self.database.execute("SELECT expires_at, media FROM media WHERE ad_id = ?", (ad_id,)).fetchone()
+            if row is None or now >= row[0]:
+                return None
+
+            # Promote the entry to the in-memory tier
+            media = json.loads(row[1])
+            self.store(ad_id, row[0], media)
+            return media
+
+
+    def set(self, ad_id: str, media: dict) -> None:
+        """
+        This method is responsible for caching the media urls of an ad until the earliest of their signatures expires.
+
+        Args:
+            ad_id (str): The id of the ad.
+            media (dict): The "video_sd_url", "video_hd_url" and "image_urls" of the ad.
+        """
+
+        urls = [media.get("video_sd_url"), media.get("video_hd_url")] + list(media.get("image_urls") or [])
+        expiries = [expiry for expiry in (get_signed_url_expiry(url) for url in urls if url) if expiry is not None]
+
+        now = time.time()
+        expires_at = min(expiries) - self.safety_margin if expiries else now + self.default_ttl
+        if expires_at <= now:
+            return
+
+        with self.lock:
+            self.store(ad_id, expires_at, media)
+
+            if self.database is not None:
+                self.database.execute(
+                    "INSERT OR REPLACE INTO media (ad_id, expires_at, media) VALUES (?, ?, ?)",
+                    (ad_id, expires_at, json.dumps(media))
+                )
+                self.database.execute("DELETE FROM media WHERE expires_at <= ?", (now,))
+                self.database.commit()
+
+
+    def store(self, ad_id: str, expires_at: float, media: dict) -> None:
+        """
+        This method is responsible for adding an entry to the in-memory tier, evicting the least recently used ones. Called with the lock held.
+
+        Args:
+            ad_id (str): The id of the ad.
+            expires_at (float): The unix timestamp after which the entry is no longer served.
+            media (dict): The media urls of the ad.
+        """
+
+        self.entries[ad_id] = (expires_at, media)
+        self.entries.move_to_end(ad_id)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class CreativeCache:
+    """
+    This class is responsible for caching the creative texts looked up for each Facebook ad, which never change once the ad is created.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400.0) -> None:
+        """
+        The constructor initializes the in-memory entries.
+
+        Args:
+            max_entries (int): The maximum number of ads kept in memory.
+            ttl (float): The number of seconds the texts of an ad are kept.
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get_many(self, ad_ids: list[str]) -> dict:
+        """
+        This method is responsible for getting the creative texts of several ads.
+
+        Args:
+            ad_ids (list[str]): The ids of the ads.
+
+        Returns:
+            dict: The "ad_creative_*" fields of each cached ad, keyed by ad id (the ads missing or expired are left out).
+        """
+
+        now = time.monotonic()
+        creatives = {}
+
+        with self.lock:
+            for ad_id in ad_ids:
+                entry = self.entries.get(ad_id)
+                if entry is None:
+                    continue
+                if now >= entry[0]:
+                    del self.entries[ad_id]
+                    continue
+                self.entries.move_to_end(ad_id)
+                creatives[ad_id] = entry[1]
+
+        return creatives
+
+
+    def set(self, ad_id: str, creative: dict) -> None:
+        """
+        This method is responsible for caching the creative texts of an ad, evicting the least recently used ones.
+
+        Args:
+            ad_id (str): The id of the ad.
+            creative (dict): The "ad_creative_*" fields of the ad (empty if it has none).
+        """
+
+        with self.lock:
+            self.entries[ad_id] = (time.monotonic() + self.ttl, creative)
+            self.entries.move_to_end(ad_id)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+# Instantiate the media cache shared by all the requests
+media_cache = MediaCache(
+    max_entries=int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", 10000)),
+    safety_margin=float(os.getenv("MEDIA_CACHE_SAFETY_MARGIN", 600)),
+    default_ttl=float(os.getenv("MEDIA_CACHE_DEFAULT_TTL", 3600)),
+    database_path=os.getenv("MEDIA_CACHE_DATABASE") or None
+)
+
+# Instantiate the creative texts cache shared by all the requests
+creative_cache = CreativeCache(
+    max_entries=int(os.getenv("CREATIVE_CACHE_MAX_ENTRIES", 10000)),
+    ttl=float(os.getenv("CREATIVE_CACHE_TTL", 86400))
+)
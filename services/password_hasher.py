@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+# CryptContext for verifying the passwords, in the worker processes
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# The workers are started from a clean server process rather than forked from the threads of the application
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class PasswordHasherBusy(Exception):
+    """
+    This exception is raised when too many passwords are already being hashed or waiting to be, or when a password
+    could not be checked in time.
+    """
+
+
+def get_rounds(hashed_password: str) -> int | None:
+    """
+    This function is responsible for reading the cost factor of a bcrypt hash.
+
+    Args:
+        hashed_password (str): The hash (e.g. "$2b$12$...").
+
+    Returns:
+        int: The number of rounds (as a power of two).
+        None: None if the hash is not a bcrypt hash.
+    """
+
+    parts = hashed_password.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """
+    This function is responsible for hashing a password. It runs in a worker process.
+
+    Args:
+        password (str): The password.
+        rounds (int): The bcrypt cost factor.
+
+    Returns:
+        str: The hash.
+    """
+
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def verify_password(password: str, hashed_password: str, rounds: int) -> tuple[bool, str | None]:
+    """
+    This function is responsible for verifying a password, and hashing it again if its cost factor changed. It runs in a worker process.
+
+    Args:
+        password (str): The password.
+        hashed_password (str): The stored hash.
+        rounds (int): The current bcrypt cost factor.
+
+    Returns:
+        tuple[bool, str | None]: Whether the password is correct, and its new hash if it has to be replaced.
+    """
+
+    if not pwd_context.verify(password, hashed_password):
+        return False, None
+
+    if get_rounds(hashed_password) != rounds:
+        return True, hash_password(password, rounds)
+
+    return True, None
+
+
+class PasswordHasher:
+    """
+    This class is responsible for hashing and verifying the passwords in a dedicated process pool, so that a burst
+    of logins does not hold the request threads and the GIL for a quarter of a second each.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16, rounds: int = 12, timeout: float = 10.0) -> None:
+        """
+        The constructor initializes the admission limit. The process pool is only started by the first password.
+
+        Args:
+            max_workers (int): The number of worker processes.
+            max_queue (int): The maximum number of passwords waiting for a worker, the others are refused.
+            rounds (int): The bcrypt cost factor of the new hashes. The hashes with another one are replaced on login.
+            timeout (float): The number of seconds a request waits for its password.
+        """
+
+        self.max_workers = max_workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.executor = None
+        self.lock = threading.Lock()
+
+
+    def submit(self, function: Callable, *args: Any) -> Any:
+        """
+        This method is responsible for running a function in the process pool, unless the queue is full.
+
+        Args:
+            function (Callable): The module level function to run.
+            args (Any): The arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+
+        Raises:
+            PasswordHasherBusy: If the queue is full, the result takes longer than the timeout or the worker died.
+        """
+
+        # Refuse right away rather than letting the waiting logins pile up
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many passwords are being checked, please retry in a moment.")
+
+        try:
+            executor = self.get_executor()
+            try:
+                future = executor.submit(function, *args)
+            except BrokenProcessPool:
+                # A worker died since the last password, the pool is replaced before sending this one
+                self.reset(executor)
+                executor = self.get_executor()
+                future = executor.submit(function, *args)
+        except Exception:
+            self.slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self.slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy("The password could not be checked in time, please retry in a moment.")
+        except BrokenProcessPool:
+            # A worker died with this password (e.g. killed for its memory), the next ones get a new pool
+            self.reset(executor)
+            raise PasswordHasherBusy("The password could not be checked, please retry in a moment.")
+
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """
+        This method is responsible for getting the process pool, starting it if needed.
+
+        Returns:
+            ProcessPoolExecutor: The process pool.
+        """
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(START_METHOD))
+
+            return self.executor
+
+
+    def reset(self, executor: ProcessPoolExecutor) -> None:
+        """
+        This method is responsible for dropping a broken process pool, unless another caller already replaced it.
+
+        Args:
+            executor (ProcessPoolExecutor): The broken process pool.
+        """
+
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def hash(self, password: str) -> str:
+        """
+        This method is responsible for hashing a password with the current cost factor.
+
+        Args:
+            password (str): The password.
+
+        Returns:
+            str: The hash.
+        """
+
+        return self.submit(hash_password, password, self.rounds)
+
+
+    def verify(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """
+        This method is responsible for verifying a password against its stored hash.
+
+        Args:
+            password (str): The password.
+            hashed_password (str): The stored hash.
+
+        Returns:
+            tuple[bool, str | None]: Whether the password is correct, and its new hash if the cost factor changed.
+        """
+
+        return self.submit(verify_password, password, hashed_password, self.rounds)
+
+
+    def shutdown(self) -> None:
+        """
+        This method is responsible for stopping the worker processes.
+        """
+
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+
+# Instantiate the password hasher shared by all the requests
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("PASSWORD_HASHER_WORKERS", 2)),
+    max_queue=int(os.getenv("PASSWORD_HASHER_MAX_QUEUE", 16)),
+    rounds=int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12)),
+    timeout=float(os.getenv("PASSWORD_HASHER_TIMEOUT", 10))
+)
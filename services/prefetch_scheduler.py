@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from ads_apis.facebook import FacebookAPI
+from ads_apis.rate_limiter import facebook_rate_limiter, tiktok_rate_limiter
+from ads_apis.tiktok import TikTokAPI
+from services.ads_index import ads_index
+from services.result_cache import ResultCache, ads_cache
+from services.singleflight import upstream_flight
+from services.snapshot_enricher import snapshot_enricher
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    """
+    This class is responsible for keeping the most popular searches fresh in the results cache, in the background.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = False,
+            interval: float = 60.0,
+            top_k: int = 20,
+            refresh_ahead: float = 90.0,
+            max_tracked: int = 1000,
+            decay: float = 0.9,
+            cache: ResultCache = ads_cache
+        ) -> None:
+        """
+        The constructor initializes the search frequencies. The scheduler thread is only started by start().
+
+        Args:
+            enabled (bool): Whether the scheduler thread runs at all.
+            interval (float): The number of seconds between two rounds of refreshes.
+            top_k (int): The number of most frequent searches kept fresh.
+            refresh_ahead (float): The number of seconds before expiry after which a search is refreshed.
+            max_tracked (int): The maximum number of searches whose frequency is tracked.
+            decay (float): The factor the frequencies are multiplied by every round, so that old trends fade.
+            cache (ResultCache): The results cache to keep fresh.
+        """
+
+        self.enabled = enabled
+        self.interval = interval
+        self.top_k = top_k
+        self.refresh_ahead = refresh_ahead
+        self.max_tracked = max_tracked
+        self.decay = decay
+        self.cache = cache
+        self.frequencies = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.rate_limiters = {"facebook": facebook_rate_limiter, "tiktok": tiktok_rate_limiter}
+
+
+    def record(self, platform: str, search_term: str, country: str) -> None:
+        """
+        This method is responsible for counting a search of a user.
+
+        Args:
+            platform (str): The platform of the search ("facebook" or "tiktok").
+            search_term (str): The search term.
+            country (str): The country.
+        """
+
+        key = (platform, search_term, country)
+
+        with self.lock:
+            self.frequencies[key] = self.frequencies.get(key, 0.0) + 1.0
+
+            # Forget the least frequent searches once there are too many
+            if len(self.frequencies) > 2 * self.max_tracked:
+                kept = sorted(self.frequencies.items(), key=lambda item: item[1], reverse=True)[:self.max_tracked]
+                self.frequencies = dict(kept)
+
+
+    def top_searches(self) -> list[tuple]:
+        """
+        This method is responsible for getting the most frequent searches, and decaying all the frequencies.
+
+        Returns:
+            list[tuple]: The (platform, search term, country) of the top_k most frequent searches.
+        """
+
+        with self.lock:
+            top = sorted(self.frequencies, key=self.frequencies.get, reverse=True)[:self.top_k]
+            self.frequencies = {key: count * self.decay for key, count in self.frequencies.items() if count * self.decay >= 0.1}
+
+        return top
+
+
+    def refresh(self, platform: str, search_term: str, country: str, facebook_ads_api: FacebookAPI, tiktok_ads_api: TikTokAPI) -> bool:
+        """
+        This method is responsible for refreshing a search in the cache, and resolving its video urls ahead of time.
+
+        Args:
+            platform (str): The platform of the search.
+            search_term (str): The search term.
+            country (str): The country.
+            facebook_ads_api (FacebookAPI): The Facebook API client.
+            tiktok_ads_api (TikTokAPI): The TikTok API client.
+
+        Returns:
+            bool: True if the search was refreshed, False if it was still fresh or the upstream had no headroom.
+        """
+
+        expires_in = self.cache.expires_in(platform, (search_term, country))
+        if expires_in is not None and expires_in > self.refresh_ahead:
+            return False
+
+        # Background refreshes only use the capacity the users leave unused
+        if not self.rate_limiters[platform].has_headroom():
+            return False
+
+        api = facebook_ads_api if platform == "facebook" else tiktok_ads_api
+        response = upstream_flight.do((platform, search_term, country), lambda: api.get_ads(search_term, country))
+        self.cache.set((platform, search_term, country), response)
+        ads_index.add_response(platform, response, search_term)
+
+        if platform == "facebook" and isinstance(response, dict) and isinstance(response.get("data"), list):
+            # The media cache keeps the urls, the enriched copies are dropped
+            snapshot_enricher.enrich([dict(ad) for ad in response["data"]])
+
+        return True
+
+
+    def run(self) -> None:
+        """
+        This method is run by the scheduler thread, refreshing the top searches every interval.
+        """
+
+        facebook_ads_api = FacebookAPI()
+        tiktok_ads_api = TikTokAPI()
+
+        while not self.stopped.wait(self.interval):
+            for platform, search_term, country in self.top_searches():
+                if self.stopped.is_set():
+                    return
+                try:
+                    self.refresh(platform, search_term, country, facebook_ads_api, tiktok_ads_api)
+                except Exception:
+                    logger.exception("Could not prefetch the %s ads for %r in %s", platform, search_term, country)
+
+
+    def start(self) -> None:
+        """
+        This method is responsible for starting the scheduler thread, if the prefetch is enabled.
+        """
+
+        if self.enabled and self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="prefetch-scheduler", daemon=True)
+            self.thread.start()
+
+
+    def stop(self) -> None:
+        """
+        This method is responsible for stopping the scheduler thread after the search being refreshed.
+        """
+
+        self.stopped.set()
+
+
+# Instantiate the prefetch scheduler shared by the application
+prefetch_scheduler = PrefetchScheduler(
+    enabled=os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes"),
+    interval=float(os.getenv("PREFETCH_INTERVAL", 60)),
+    top_k=int(os.getenv("PREFETCH_TOP_K", 20)),
+    refresh_ahead=float(os.getenv("PREFETCH_REFRESH_AHEAD", 90))
+)
@@ -0,0 +1,119 @@
+import urllib.parse
+
+# Keys added by the service itself, kept whatever fields are requested
+SERVICE_FIELDS = ("reached_countries", "creative_count", "creative_ids")
+
+
+def strip_access_token(url: str) -> str:
+    """
+    This function is responsible for removing the access token from a Graph API or snapshot url.
+
+    Args:
+        url (str): The url (e.g. "https://www.facebook.com/ads/archive/render_ad/?id=1&access_token=...").
+
+    Returns:
+        str: The url without its "access_token" parameter.
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    query = [(key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if key != "access_token"]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def parse_fields(fields: str | None) -> list[list[str]]:
+    """
+    This function is responsible for converting a comma separated fields parameter to field paths.
+
+    Args:
+        fields (str): The fields (e.g. "id,page_id" for Facebook or "ad.id,advertiser.business_name" for TikTok).
+
+    Returns:
+        list[list[str]]: The path of every field (e.g. [["ad", "id"], ["advertiser", "business_name"]]).
+    """
+
+    if not fields:
+        return []
+
+    # Graph API sub-field selections (e.g. "page{name}") are kept whole under their top level field
+    return [field.strip().split("{")[0].split(".") for field in fields.split(",") if field.strip()]
+
+
+def project(value: dict, paths: list[list[str]]) -> dict:
+    """
+    This function is responsible for copying the requested field paths of a dict.
+
+    Args:
+        value (dict): The dict to project.
+        paths (list[list[str]]): The field paths to keep.
+
+    Returns:
+        dict: A new dict with only the requested fields.
+    """
+
+    projected = {}
+
+    for path in paths:
+        source, target = value, projected
+        for depth, key in enumerate(path):
+            if not isinstance(source, dict) or key not in source:
+                break
+            if depth == len(path) - 1:
+                target[key] = source[key]
+            else:
+                source = source[key]
+                target = target.setdefault(key, {})
+
+    return projected
+
+
+def trim_ad(ad: dict, paths: list[list[str]]) -> dict:
+    """
+    This function is responsible for trimming an ad to the requested fields and removing the access token from its snapshot url.
+
+    Args:
+        ad (dict): The ad.
+        paths (list[list[str]]): The field paths to keep (all the fields if empty).
+
+    Returns:
+        dict: A trimmed copy of the ad.
+    """
+
+    trimmed = project(ad, paths + [[field] for field in SERVICE_FIELDS]) if paths else dict(ad)
+
+    if isinstance(trimmed.get("ad_snapshot_url"), str):
+        trimmed["ad_snapshot_url"] = strip_access_token(trimmed["ad_snapshot_url"])
+
+    return trimmed
+
+
+def trim_response(response: dict, fields: str | None) -> dict:
+    """
+    This function is responsible for trimming the ads of a Facebook, TikTok or merged response to the requested fields,
+    without ever exposing our access token.
+
+    Args:
+        response (dict): The response (shared with the cache, it is not modified).
+        fields (str): The comma separated fields requested by the client (all the fields if empty).
+
+    Returns:
+        dict: A trimmed copy of the response.
+    """
+
+    if not isinstance(response, dict):
+        return response
+
+    paths = parse_fields(fields)
+    trimmed = dict(response)
+    data = response.get("data")
+
+    if isinstance(data, list):
+        trimmed["data"] = [trim_ad(ad, paths) for ad in data]
+    elif isinstance(data, dict) and isinstance(data.get("ads"), list):
+        # TikTok nests the ads under "data.ads"
+        trimmed["data"] = dict(data, ads=[trim_ad(ad, paths) for ad in data["ads"]])
+
+    paging = response.get("paging")
+    if isinstance(paging, dict) and isinstance(paging.get("next"), str):
+        trimmed["paging"] = dict(paging, next=strip_access_token(paging["next"]))
+
+    return trimmed
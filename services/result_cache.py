@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+def is_cacheable(response: Any) -> bool:
+    """
+    This function is responsible for telling whether an upstream response is a successful result worth caching.
+
+    Args:
+        response (Any): The JSON response of the Facebook or TikTok API.
+
+    Returns:
+        bool: True if the response can be cached, False otherwise.
+    """
+
+    if not isinstance(response, dict):
+        return False
+
+    # TikTok always sends an "error" object, with the code "ok" on success
+    error = response.get("error", None)
+    if error is None:
+        return True
+
+    return isinstance(error, dict) and error.get("code", None) == "ok"
+
+
+class ResultCache:
+    """
+    This class is responsible for caching the ads search results with a TTL per platform and LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttls: dict | None = None, stale_ttl: float = 600.0, default_ttl: float = 300.0) -> None:
+        """
+        The constructor initializes the cache entries, the counters and the background revalidation pool.
+
+        Args:
+            max_entries (int): The maximum number of results kept in memory.
+            ttls (dict): The number of seconds a result stays fresh, per platform.
+            stale_ttl (float): The number of seconds after expiry during which a stale result is still served while it is refreshed.
+            default_ttl (float): The TTL of the platforms missing from ttls.
+        """
+
+        self.max_entries = max_entries
+        self.ttls = ttls or {}
+        self.stale_ttl = stale_ttl
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()
+        self.revalidating = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="result-cache")
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "revalidations": 0, "fallbacks": 0}
+
+
+    def get_or_load(self, platform: str, key: tuple, loader: Callable[[], Any]) -> Any:
+        """
+        This method is responsible for returning the cached result of a search, loading it from upstream on a miss.
+        If the upstream call fails, the last good result is returned, however old it is.
+
+        Args:
+            platform (str): The platform of the search (e.g. "facebook", "tiktok").
+            key (tuple): The search parameters (e.g. search term and country).
+            loader (Callable[[], Any]): The function calling the upstream API.
+
+        Returns:
+            Any: The result of the search.
+        """
+
+        cache_key = (platform,) + key
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(cache_key)
+
+            if entry is not None:
+                expires_at, value = entry
+
+                if now < expires_at:
+                    self.counters["hits"] += 1
+                    self.entries.move_to_end(cache_key)
+                    return value
+
+                if now < expires_at + self.stale_ttl:
+                    # Serve the stale result right away and refresh it in the background
+                    self.counters["stale_hits"] += 1
+                    self.entries.move_to_end(cache_key)
+                    if cache_key not in self.revalidating:
+                        self.revalidating.add(cache_key)
+                        self.executor.submit(self.revalidate, cache_key, loader)
+                    return value
+
+            self.counters["misses"] += 1
+
+        try:
+            value = loader()
+        except Exception:
+            if entry is None:
+                raise
+            value = None
+
+        if not is_cacheable(value) and entry is not None:
+            # The upstream failed (or its circuit is open), the last good result is better than an error
+            with self.lock:
+                self.counters["fallbacks"] += 1
+            return entry[1]
+
+        self.set(cache_key, value)
+        return value
+
+
+    def revalidate(self, cache_key: tuple, loader: Callable[[], Any]) -> None:
+        """
+        This method is responsible for refreshing a stale entry from upstream.
+
+        Args:
+            cache_key (tuple): The key of the entry.
+            loader (Callable[[], Any]): The function calling the upstream API.
+        """
+
+        try:
+            value = loader()
+        except Exception:
+            # The stale entry keeps being served until it is too old
+            value = None
+
+        self.set(cache_key, value)
+
+        with self.lock:
+            self.revalidating.discard(cache_key)
+            if is_cacheable(value):
+                self.counters["revalidations"] += 1
+
+
+    def set(self, cache_key: tuple, value: Any) -> None:
+        """
+        This method is responsible for storing a successful result, evicting the least recently used entries if needed.
+
+        Args:
+            cache_key (tuple): The key of the entry.
+            value (Any): The result of the search.
+        """
+
+        if not is_cacheable(value):
+            return
+
+        expires_at = time.monotonic() + self.ttls.get(cache_key[0], self.default_ttl)
+
+        with self.lock:
+            self.entries[cache_key] = (expires_at, value)
+            self.entries.move_to_end(cache_key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+
+    def expires_in(self, platform: str, key: tuple) -> float | None:
+        """
+        This method is responsible for telling how long the cached result of a search stays fresh.
+
+        Args:
+            platform (str): The platform of the search.
+            key (tuple): The search parameters.
+
+        Returns:
+            float: The number of seconds before the result expires (negative if it already has).
+            None: None if the search is not cached.
+        """
+
+        with self.lock:
+            entry = self.entries.get((platform,) + key)
+
+        return entry[0] - time.monotonic() if entry is not None else None
+
+
+    def stats(self) -> dict:
+        """
+        This method is responsible for returning the cache counters.
+
+        Returns:
+            dict: The hits, stale hits, misses, evictions, revalidations and fallbacks counters and the current size.
+        """
+
+        with self.lock:
+            return dict(self.counters, size=len(self.entries), max_entries=self.max_entries)
+
+
+# Instantiate the ads results cache shared by all the requests
+ads_cache = ResultCache(
+    max_entries=int(os.getenv("ADS_CACHE_MAX_ENTRIES", 1024)),
+    ttls={
+        "facebook": float(os.getenv("ADS_CACHE_FACEBOOK_TTL", 300)),
+        "tiktok": float(os.getenv("ADS_CACHE_TIKTOK_TTL", 900))
+    },
+    stale_ttl=float(os.getenv("ADS_CACHE_STALE_TTL", 600))
+)
@@ -0,0 +1,264 @@
+import datetime as dt
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from repositories.RevokedTokenRepository import RevokedTokenRepository
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+logger = logging.getLogger(__name__)
+
+# Whether the access tokens are verified from their signature and claims alone, instead of the active sessions
+STATELESS_AUTH = os.getenv("AUTH_MODE", "session").lower() == "stateless"
+
+
+def get_token_id(token: str) -> str:
+    """
+    This function is responsible for identifying an access token without storing it.
+
+    Args:
+        token (str): The access token.
+
+    Returns:
+        str: The hex SHA-256 of the token.
+    """
+
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """
+    This class is responsible for telling in a few bits per entry whether a token id may have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        """
+        The constructor sizes the bit array for the capacity and false positive rate.
+
+        Args:
+            capacity (int): The number of entries the false positive rate holds for.
+            error_rate (float): The false positive rate at capacity.
+        """
+
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+
+    def positions(self, token_id: str) -> list[int]:
+        """
+        This method is responsible for getting the bit positions of an entry, by double hashing.
+
+        Args:
+            token_id (str): The hex token id.
+
+        Returns:
+            list[int]: The positions of the entry.
+        """
+
+        # The token id is already a uniform hash, its two halves seed the probes
+        first, second = int(token_id[:16], 16), int(token_id[16:32], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+
+    def add(self, token_id: str) -> None:
+        """
+        This method is responsible for adding an entry.
+
+        Args:
+            token_id (str): The hex token id.
+        """
+
+        for position in self.positions(token_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+    def __contains__(self, token_id: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(token_id))
+
+
+class RevocationList:
+    """
+    This class is responsible for keeping the revoked access tokens in memory, so that the tokens can be verified
+    without a database round trip.
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 100000, error_rate: float = 0.001, interval: float = 5.0) -> None:
+        """
+        The constructor initializes the empty filter and exact set. The revocations are only loaded by start().
+
+        Args:
+            enabled (bool): Whether the revocations are loaded and polled at all.
+            capacity (int): The initial number of revocations the Bloom filter is sized for.
+            error_rate (float): The false positive rate of the Bloom filter, the false positives are resolved by the exact set.
+            interval (float): The number of seconds between two polls of the revocations made by the other workers.
+        """
+
+        self.enabled = enabled
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.interval = interval
+        self.filter = BloomFilter(capacity, error_rate)
+        self.revoked = {}
+        self.revoked_since = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+
+    def is_revoked(self, token: str) -> bool:
+        """
+        This method is responsible for telling whether an access token was revoked.
+
+        Args:
+            token (str): The access token.
+
+        Returns:
+            bool: True if the token was revoked.
+        """
+
+        token_id = get_token_id(token)
+
+        # Almost every token is not revoked, and the filter says so without looking the set up
+        if token_id not in self.filter:
+            return False
+
+        with self.lock:
+            return token_id in self.revoked
+
+
+    def add(self, token_id: str, expiry_time: float) -> None:
+        """
+        This method is responsible for adding a revocation to the filter and the exact set.
+
+        Args:
+            token_id (str): The token id.
+            expiry_time (float): The expiry of the token, as a unix timestamp.
+        """
+
+        with self.lock:
+            if token_id in self.revoked:
+                return
+
+            self.revoked[token_id] = expiry_time
+            self.filter.add(token_id)
+
+            if self.filter.count > self.filter.capacity:
+                self.rebuild()
+
+
+    def rebuild(self) -> None:
+        """
+        This method is responsible for dropping the expired revocations and resizing the filter. Called with the lock held.
+        """
+
+        now = time.time()
+        self.revoked = {token_id: expiry_time for token_id, expiry_time in self.revoked.items() if expiry_time > now}
+
+        # A filter cannot forget its entries, it is rebuilt from the exact set
+        bloom_filter = BloomFilter(max(self.capacity, 2 * len(self.revoked)), self.error_rate)
+        for token_id in self.revoked:
+            bloom_filter.add(token_id)
+        self.filter = bloom_filter
+
+
+    def revoke(self, token: str, email: str, expiry_time: float, repository: RevokedTokenRepository | None = None) -> None:
+        """
+        This method is responsible for revoking an access token, in this worker right away and in the others at their next poll.
+
+        Args:
+            token (str): The access token.
+            email (str): The email of the user.
+            expiry_time (float): The "exp" claim of the token, as a unix timestamp.
+            repository (RevokedTokenRepository): The revoked tokens repository.
+        """
+
+        token_id = get_token_id(token)
+        self.add(token_id, expiry_time)
+        (repository or RevokedTokenRepository()).revoke(token_id, email, datetime.fromtimestamp(expiry_time, dt.UTC))
+
+
+    def load(self, repository: RevokedTokenRepository) -> int:
+        """
+        This method is responsible for adding the revocations made since the last load.
+
+        Args:
+            repository (RevokedTokenRepository): The revoked tokens repository.
+
+        Returns:
+            int: The number of revocations read.
+        """
+
+        # The revocations committed around the previous poll are read again, the exact set ignores them
+        revoked_since = self.revoked_since - timedelta(seconds=self.interval) if self.revoked_since else None
+        revocations = repository.find_revoked(revoked_since)
+
+        for revocation in revocations:
+            # The datetimes come back naive, in UTC
+            expiry_time = revocation["expiry_time"].replace(tzinfo=dt.UTC).timestamp()
+            self.add(revocation["token_id"], expiry_time)
+
+        if revocations:
+            self.revoked_since = revocations[-1]["revoked_at"]
+
+        return len(revocations)
+
+
+    def run(self, repository: RevokedTokenRepository) -> None:
+        """
+        This method is run by the poller thread, adding the revocations of the other workers every interval.
+
+        Args:
+            repository (RevokedTokenRepository): The revoked tokens repository.
+        """
+
+        while not self.stopped.wait(self.interval):
+            try:
+                self.load(repository)
+            except Exception:
+                logger.exception("Could not poll the revoked tokens")
+
+
+    def start(self) -> None:
+        """
+        This method is responsible for loading all the revocations, then starting the poller thread, if enabled.
+        """
+
+        if not self.enabled or self.thread is not None:
+            return
+
+        repository = RevokedTokenRepository()
+
+        # The application only starts serving once every revocation is known
+        self.load(repository)
+
+        self.thread = threading.Thread(target=self.run, args=(repository,), name="revocation-list", daemon=True)
+        self.thread.start()
+
+
+    def stop(self) -> None:
+        """
+        This method is responsible for stopping the poller thread.
+        """
+
+        self.stopped.set()
+
+
+# Instantiate the revocation list shared by all the requests
+revocation_list = RevocationList(
+    enabled=STATELESS_AUTH,
+    capacity=int(os.getenv("REVOCATION_LIST_CAPACITY", 100000)),
+    interval=float(os.getenv("REVOCATION_LIST_INTERVAL", 5))
+)
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class SessionCache:
+    """
+    This class is responsible for caching the active sessions of the users, so that the session checks of the ads
+    requests do not hit the database and decode the token every time. Each process keeps its own cache: a session ended
+    in one worker is still trusted by the others until their entry expires, at most ttl seconds later.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0) -> None:
+        """
+        The constructor initializes the cache entries.
+
+        Args:
+            max_entries (int): The maximum number of sessions cached, the least recently used ones are evicted first.
+            ttl (float): The maximum number of seconds a session is trusted without checking the database again.
+                It also bounds how long another worker may serve a session it was not told about the end of.
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def is_active(self, email: str) -> bool:
+        """
+        This method is responsible for telling whether a session is known to be active.
+
+        Args:
+            email (str): The email of the user.
+
+        Returns:
+            bool: True if the session is cached and still valid, False if the database has to be checked.
+        """
+
+        with self.lock:
+            expires_at = self.entries.get(email)
+            if expires_at is None:
+                return False
+
+            if time.time() >= expires_at:
+                del self.entries[email]
+                return False
+
+            self.entries.move_to_end(email)
+            return True
+
+
+    def set(self, email: str, expiry_time: float) -> None:
+        """
+        This method is responsible for caching an active session, at most until its token expires.
+
+        Args:
+            email (str): The email of the user.
+            expiry_time (float): The "exp" claim of the token, as a unix timestamp.
+        """
+
+        with self.lock:
+            self.entries[email] = min(time.time() + self.ttl, expiry_time)
+            self.entries.move_to_end(email)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+    def invalidate(self, email: str) -> None:
+        """
+        This method is responsible for forgetting the session of a user in this process, after it was ended.
+
+        Args:
+            email (str): The email of the user.
+        """
+
+        with self.lock:
+            self.entries.pop(email, None)
+
+
+# Instantiate the session cache shared by all the requests
+session_cache = SessionCache(
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 10000)),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", 30))
+)
@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class Call:
+    """
+    This class is responsible for holding the outcome of an in-flight call shared by several callers.
+    """
+
+    def __init__(self) -> None:
+        """
+        The constructor initializes the completion event and the outcome of the call.
+        """
+
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    This class is responsible for coalescing identical concurrent calls into a single one.
+    """
+
+    def __init__(self) -> None:
+        """
+        The constructor initializes the in-flight calls.
+        """
+
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        This method is responsible for running fn, unless a call with the same key is already in flight,
+        in which case its result is awaited and shared.
+
+        Args:
+            key (Hashable): The key identifying identical calls.
+            fn (Callable[[], Any]): The call.
+
+        Returns:
+            Any: The result of the call (the exception of the call is raised to every caller).
+        """
+
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = Call()
+                self.calls[key] = call
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            # Wait for the caller that started the call and share its outcome
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+
+# Instantiate the flights shared by all the requests
+upstream_flight = SingleFlight()
+snapshot_flight = SingleFlight()
@@ -0,0 +1,239 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Iterator
+
+import requests
+from dotenv import load_dotenv
+
+from ads_apis.http_client import HttpClient, http_client
+from ads_apis.snapshot_parser import parse_snapshot
+from services.media_cache import MediaCache, media_cache
+from services.singleflight import snapshot_flight
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+
+class SnapshotEnricher:
+    """
+    This class is responsible for resolving the media urls of the ads from their snapshot pages concurrently.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = 8,
+            timeout: float = 5.0,
+            request_timeout: float = 10.0,
+            chunk_size: int = 16 * 1024,
+            http_client: HttpClient = http_client,
+            media_cache: MediaCache = media_cache
+        ) -> None:
+        """
+        The constructor initializes the bounded thread pool used to fetch the snapshot pages.
+
+        Args:
+            max_workers (int): The maximum number of snapshot pages fetched at the same time.
+            timeout (float): The time in seconds, from the start of its fetch, after which an ad is returned without its video url.
+            request_timeout (float): The time in seconds after which the ads whose fetch has not started yet (queued behind
+                the fetches of the other requests) are returned without their video url.
+            chunk_size (int): The number of bytes of the snapshot page read at a time.
+            http_client (HttpClient): The pooled HTTP client used to reach the fbcdn hosts.
+            media_cache (MediaCache): The cache of the media urls already resolved, per ad.
+        """
+
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self.chunk_size = chunk_size
+        self.http_client = http_client
+        self.media_cache = media_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot-enricher")
+
+
+    def fetch_media(self, snapshot_url: str) -> dict | None:
+        """
+        This method is responsible for streaming a snapshot page and extracting the media urls from it.
+
+        Args:
+            snapshot_url (str): The url of the ad snapshot page.
+
+        Returns:
+            dict: The "video_sd_url", "video_hd_url" and "image_urls" found in the snapshot page.
+            None: None if the page could not be fetched in time.
+        """
+
+        deadline = time.monotonic() + self.timeout
+
+        try:
+            with self.http_client.get(snapshot_url, timeout=self.timeout, stream=True) as response:
+                # The rest of the page is not downloaded once the video urls are found
+                return parse_snapshot(self.iter_chunks(response, deadline))
+        except (requests.exceptions.RequestException, TimeoutError):
+            return None
+
+
+    def iter_chunks(self, response: requests.Response, deadline: float) -> Iterator[bytes]:
+        """
+        This method is responsible for reading the body of a snapshot page until the deadline of its fetch.
+
+        Args:
+            response (requests.Response): The streamed response.
+            deadline (float): The time.monotonic() after which the page is given up.
+
+        Returns:
+            Iterator[bytes]: The chunks of the body.
+
+        Raises:
+            TimeoutError: If the deadline passes before the page is read.
+        """
+
+        # The requests timeout only bounds each read, a slow trickle of chunks is bounded here
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            if time.monotonic() > deadline:
+                raise TimeoutError("The snapshot page took too long to read.")
+            yield chunk
+
+
+    def fetch_media_timed(self, started: dict, ad: dict, request_deadline: float) -> dict | None:
+        """
+        This method is responsible for fetching the media urls of an ad, recording when a worker started on it.
+
+        Args:
+            started (dict): The start time of each fetch, by id of the ad dict.
+            ad (dict): The ad.
+            request_deadline (float): The time.monotonic() after which the request no longer waits for a fetch to start.
+
+        Returns:
+            dict: The "video_sd_url", "video_hd_url" and "image_urls" found in the snapshot page.
+            None: None if the page could not be fetched, or the request gave up on it before it started.
+        """
+
+        # The request no longer waits for this ad, the worker is left to the other requests
+        if time.monotonic() > request_deadline:
+            return None
+
+        started[id(ad)] = time.monotonic()
+        return self.fetch_media_once(ad.get("id"), ad["ad_snapshot_url"])
+
+
+    def fetch_media_once(self, ad_id: str | None, snapshot_url: str) -> dict | None:
+        """
+        This method is responsible for fetching the media urls of an ad, sharing the fetch with the concurrent requests for the same ad.
+
+        Args:
+            ad_id (str): The id of the ad (None to always fetch).
+            snapshot_url (str): The url of the ad snapshot page.
+
+        Returns:
+            dict: The "video_sd_url", "video_hd_url" and "image_urls" found in the snapshot page.
+            None: None if the page could not be fetched.
+        """
+
+        if ad_id is None:
+            return self.fetch_media(snapshot_url)
+
+        media = snapshot_flight.do(ad_id, lambda: self.fetch_media(snapshot_url))
+
+        # Pages without any media url are not cached, they are usually a failed render
+        if media is not None and (media["video_sd_url"] or media["video_hd_url"] or media["image_urls"]):
+            self.media_cache.set(ad_id, media)
+
+        return media
+
+
+    def enrich(self, ads: list[dict]) -> list[dict]:
+        """
+        This method is responsible for setting the "video_url" of every ad, fetching all the uncached snapshot pages at once.
+        Each page gets the whole timeout from the moment a worker starts on it, so the ads queued behind the first
+        max_workers pages are not cut short, but the pages not started within the request timeout are given up.
+
+        Args:
+            ads (list[dict]): The ads returned by the Facebook Ads API.
+
+        Returns:
+            list[dict]: The same ads, each with a "video_url" key (None if it could not be resolved in time) and, when resolved, "video_hd_url" and "image_urls".
+        """
+
+        for ad in ads:
+            ad["video_url"] = None
+
+        # Ads whose signed media urls are still valid need no snapshot fetch at all
+        missing = []
+        for ad in ads:
+            media = self.media_cache.get(ad["id"]) if ad.get("id") else None
+            if media is not None:
+                self.apply_media(ad, media)
+            elif ad.get("ad_snapshot_url"):
+                missing.append(ad)
+
+        started = {}
+        request_deadline = time.monotonic() + self.request_timeout
+        futures = {self.executor.submit(self.fetch_media_timed, started, ad, request_deadline): ad for ad in missing}
+
+        for future, ad in futures.items():
+            media = self.wait_media(future, started, ad, request_deadline)
+            if media is not None:
+                self.apply_media(ad, media)
+
+        return ads
+
+
+    def wait_media(self, future: Future, started: dict, ad: dict, request_deadline: float) -> dict | None:
+        """
+        This method is responsible for waiting for the fetch of an ad, until the request deadline while it is queued and
+        until its own timeout once started.
+
+        Args:
+            future (Future): The fetch of the ad.
+            started (dict): The start time of each fetch, by id of the ad dict.
+            ad (dict): The ad.
+            request_deadline (float): The time.monotonic() after which a fetch not started yet is given up.
+
+        Returns:
+            dict: The "video_sd_url", "video_hd_url" and "image_urls" found in the snapshot page.
+            None: None if the page could not be fetched in time.
+        """
+
+        while True:
+            start = started.get(id(ad))
+            deadline = request_deadline if start is None else start + self.timeout
+
+            # A fetch started after the request deadline is not waited for
+            if start is not None and start > request_deadline:
+                return None
+
+            try:
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # A fetch picked up by a worker while waiting gets its own timeout
+                if start is None and started.get(id(ad)) is not None:
+                    continue
+
+                # A queued fetch is removed from the pool, it would only hold a worker for nothing
+                future.cancel()
+                return None
+
+
+    def apply_media(self, ad: dict, media: dict) -> None:
+        """
+        This method is responsible for setting the resolved media urls on an ad.
+
+        Args:
+            ad (dict): The ad.
+            media (dict): The "video_sd_url", "video_hd_url" and "image_urls" of the ad.
+        """
+
+        ad["video_url"] = media["video_sd_url"]
+        ad["video_hd_url"] = media["video_hd_url"]
+        ad["image_urls"] = media["image_urls"]
+
+
+# Instantiate the snapshot enricher shared by all the requests
+snapshot_enricher = SnapshotEnricher(
+    max_workers=int(os.getenv("SNAPSHOT_MAX_WORKERS", 8)),
+    timeout=float(os.getenv("SNAPSHOT_TIMEOUT", 5.0)),
+    request_timeout=float(os.getenv("SNAPSHOT_REQUEST_TIMEOUT", 10.0))
+)
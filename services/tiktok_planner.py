@@ -0,0 +1,184 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from ads_apis.tiktok import DateRange
+from services.ads_aggregator import extract_ads, get_ad_id
+from services.result_cache import is_cacheable
+
+# Load the environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+# The date format of the TikTok research API
+DATE_FORMAT = "%Y%m%d"
+
+
+def shard_date_range(date_range: DateRange, shard_days: int = 7) -> list[DateRange]:
+    """
+    This function is responsible for splitting a date range into consecutive shards.
+
+    Args:
+        date_range (DateRange): The "YYYYMMDD" date range, both ends included.
+        shard_days (int): The number of days per shard (1 for daily shards, 7 for weekly shards).
+
+    Returns:
+        list[DateRange]: The shards, in chronological order.
+    """
+
+    start = datetime.strptime(date_range.min, DATE_FORMAT)
+    end = datetime.strptime(date_range.max, DATE_FORMAT)
+
+    shards = []
+    while start <= end:
+        stop = min(start + timedelta(days=shard_days - 1), end)
+        shards.append(DateRange(start.strftime(DATE_FORMAT), stop.strftime(DATE_FORMAT)))
+        start = stop + timedelta(days=1)
+
+    return shards
+
+
+class TikTokQueryPlanner:
+    """
+    This class is responsible for fetching the TikTok ads of a long date range as concurrent shards.
+    """
+
+    def __init__(self, max_workers: int = 4, shard_days: int = 7, max_pages: int = 20, page_size: int = 50, max_shards: int = 53) -> None:
+        """
+        The constructor initializes the bounded thread pool used for the shards.
+
+        Args:
+            max_workers (int): The maximum number of shards fetched at the same time.
+            shard_days (int): The default number of days per shard.
+            max_pages (int): The maximum number of pages followed per shard.
+            page_size (int): The number of ads requested per page.
+            max_shards (int): The maximum number of shards of a date range, the longer ranges are refused.
+        """
+
+        self.shard_days = shard_days
+        self.max_shards = max_shards
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tiktok-shards")
+
+
+    def plan(self, date_range: DateRange, shard_days: int | None = None) -> list[DateRange]:
+        """
+        This method is responsible for splitting a date range into the shards to fetch, unless there are too many.
+
+        Args:
+            date_range (DateRange): The "YYYYMMDD" date range, both ends included.
+            shard_days (int): The number of days per shard (default is the planner's).
+
+        Returns:
+            list[DateRange]: The shards, in chronological order.
+
+        Raises:
+            ValueError: If the dates are invalid or the range spans more than max_shards shards.
+        """
+
+        shard_days = shard_days or self.shard_days
+        days = (datetime.strptime(date_range.max, DATE_FORMAT) - datetime.strptime(date_range.min, DATE_FORMAT)).days + 1
+
+        # Every shard costs at least one upstream request, the shards are counted before any is built
+        if -(-days // shard_days) > self.max_shards:
+            raise ValueError(f"the range spans more than {self.max_shards * shard_days} days")
+
+        return shard_date_range(date_range, shard_days)
+
+
+    def fetch_shard(self, get_ads: Callable[..., dict], shard: DateRange) -> dict:
+        """
+        This method is responsible for fetching all the pages of a shard, following its search cursor.
+
+        Args:
+            get_ads (Callable[..., dict]): The function searching a page of ads, given the date range, cursor and page size.
+            shard (DateRange): The date range of the shard.
+
+        Returns:
+            dict: The ads of the shard under "ads" and whether pages were left under "has_more",
+                or the error response of the first page that failed.
+        """
+
+        ads = []
+        search_id = None
+
+        for _ in range(self.max_pages):
+            response = get_ads(shard, search_id, self.page_size)
+            if not is_cacheable(response):
+                # The pages already fetched are kept, the rest of the shard is reported as missing
+                return {"ads": ads, "has_more": True, "error": response} if ads else response
+
+            data = response.get("data") or {}
+            ads.extend(extract_ads("tiktok", response))
+            search_id = data.get("search_id")
+
+            if not data.get("has_more") or search_id is None:
+                return {"ads": ads, "has_more": False}
+
+        return {"ads": ads, "has_more": True}
+
+
+    def fetch(self, get_ads: Callable[..., dict], date_range: DateRange, shard_days: int | None = None) -> dict:
+        """
+        This method is responsible for fetching the shards of a date range in parallel and merging them in order.
+
+        Args:
+            get_ads (Callable[..., dict]): The function searching a page of ads, given the date range, cursor and page size.
+            date_range (DateRange): The "YYYYMMDD" date range, both ends included.
+            shard_days (int): The number of days per shard (default is the planner's).
+
+        Returns:
+            dict: A TikTok response with the ads of all the shards, without duplicates, under "data.ads",
+                and the failed shards under "errors". The first error response if all the shards failed.
+        """
+
+        shards = self.plan(date_range, shard_days)
+        futures = [self.executor.submit(self.fetch_shard, get_ads, shard) for shard in shards]
+
+        ads = {}
+        errors = {}
+        failures = []
+        has_more = False
+
+        # The shards are merged in chronological order, whatever order they finished in
+        for shard, future in zip(shards, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+
+            if "ads" not in result:
+                errors[f"{shard.min}-{shard.max}"] = result.get("error")
+                failures.append(result)
+                continue
+
+            if "error" in result:
+                errors[f"{shard.min}-{shard.max}"] = result["error"].get("error")
+
+            has_more = has_more or result["has_more"]
+
+            for ad in result["ads"]:
+                ad_id = get_ad_id("tiktok", ad)
+                ads.setdefault(ad_id if ad_id is not None else id(ad), ad)
+
+        if failures and len(failures) == len(shards):
+            return failures[0]
+
+        return {
+            "data": {"ads": list(ads.values()), "has_more": has_more},
+            "error": {"code": "ok"},
+            "errors": errors
+        }
+
+
+# Instantiate the TikTok query planner shared by all the requests
+tiktok_planner = TikTokQueryPlanner(
+    max_workers=int(os.getenv("TIKTOK_SHARD_MAX_WORKERS", 4)),
+    shard_days=int(os.getenv("TIKTOK_SHARD_DAYS", 7)),
+    max_pages=int(os.getenv("TIKTOK_SHARD_MAX_PAGES", 20)),
+    max_shards=int(os.getenv("TIKTOK_MAX_SHARDS", 53))
+)
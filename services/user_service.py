@@ -1,7 +1,13 @@
 from typing import Any
 
+from fastapi import HTTPException
+from jwt import PyJWTError
+
 from DTOs.user import LoginSchema, User
 from repositories.UserRepository import UserRepository
+from services.password_hasher import password_hasher
+from services.revocation_list import STATELESS_AUTH, revocation_list
+from services.session_cache import session_cache
 
 
 class UserService:
@@ -26,10 +32,46 @@ class UserService:
 
         Returns:
             User: The user object if the user is registered successfully.
-            bool: False if the user already exists.
+            bool: False if the user already exists or the password is not strong enough.
         """
 
-        return self.user_repository.register(user)
+        password = user.password.get_secret_value()
+
+        # The password is only hashed for the users that can be registered, the repository still rejects the emails
+        # registered in the meantime
+        if self.user_repository.is_email_registered(user.email) or not self.user_repository.is_password_strong(password):
+            return False
+
+        return self.user_repository.register(user, password_hasher.hash(password))
+
+
+    def is_password_correct(self, form_data: LoginSchema) -> bool:
+        """
+        This method is responsible for checking if the password is correct.
+
+        Args:
+            form_data: The form data containing the user email and password.
+
+        Returns:
+            bool: True if the password is correct, False otherwise.
+        """
+
+        # Get the user from the database
+        user = self.user_repository.get_user(form_data.email)
+
+        if user is None:
+            return False
+
+        # Check if the password is correct or not, in the password hasher processes
+        is_correct, new_hash = password_hasher.verify(form_data.password.get_secret_value(), user.password.get_secret_value())
+        if not is_correct:
+            return False
+
+        # The hashes made with another cost factor are replaced, now that the password is known
+        if new_hash is not None:
+            self.user_repository.update_password(form_data.email, new_hash)
+
+        return True
 
 
     def get_access_token(self, form_data: LoginSchema) -> dict:
@@ -44,22 +86,23 @@ class UserService:
         """
 
         # Check if the password is correct
-        if not self.user_repository.is_password_correct(form_data): return {"access_token": None, type: "bearer"}
-
-        if not self.is_session_active(form_data.email):
-            # If the session is not active, generate a new access token
-            access_token = self.user_repository.get_access_token(form_data)
-
-            if access_token is not None:
-                self.register_token_in_session(access_token)
+        if not self.is_password_correct(form_data): return {"access_token": None, type: "bearer"}
 
-            return {"access_token": access_token, "token_type": "bearer"}
+        # The session is read from the database, the session cache may still trust a session ended by another worker
+        active_access_token = self.user_repository.get_access_token_from_active_session(form_data.email)
 
-        else:
+        if active_access_token is not None:
             # If the session is already active, return the active access token
-            active_access_token = self.user_repository.get_access_token_from_active_session(form_data.email)
             return {"access_token": active_access_token, "token_type": "bearer"}
 
+        # If the session is not active, generate a new access token
+        access_token = self.user_repository.get_access_token(form_data)
+
+        if access_token is not None:
+            self.register_token_in_session(access_token)
+
+        return {"access_token": access_token, "token_type": "bearer"}
+
 
     def authenticate(self, token: str) -> bool:
         """
@@ -72,9 +115,40 @@ class UserService:
             bool: True if the user is authenticated, False otherwise.
         """
 
+        if STATELESS_AUTH:
+            self.verify_token(token)
+            return
+
         return self.user_repository.authenticate(token)
 
 
+    def verify_token(self, token: str) -> str:
+        """
+        This method is responsible for verifying a token from its signature and claims alone, without the database.
+
+        Args:
+            token (str): The token.
+
+        Returns:
+            str: The email of the user.
+        """
+
+        try:
+            # The signature and the expiry are checked by the decoding
+            payload = self.user_repository.decode_token(token)
+        except PyJWTError:
+            raise HTTPException(status_code=401, detail="Authentication failed, invalid or expired token.")
+
+        if payload.get("sub") is None or payload.get("exp") is None:
+            raise HTTPException(status_code=401, detail="Authentication failed, invalid or expired token.")
+
+        # A logged out token stays valid until its expiry, unless it is revoked
+        if revocation_list.is_revoked(token):
+            raise HTTPException(status_code=401, detail="Authentication failed, the token was revoked.")
+
+        return payload["sub"]
+
+
     def register_token_in_session(self, token: str) -> None:
         """
         This method is responsible for registering the token in the session.
@@ -83,7 +157,8 @@ class UserService:
             token (str): The access token.
         """
 
-        self.user_repository.register_token_in_session(token)
+        session = self.user_repository.register_token_in_session(token)
+        session_cache.set(session.email, session.expiry_time.timestamp())
 
 
     def logout(self, token: str) -> None:
@@ -96,16 +171,45 @@ class UserService:
 
         self.user_repository.logout(token)
 
+        # Forget the cached session of the user in this worker, the other workers trust it until their entry expires
+        try:
+            payload = self.user_repository.decode_token(token, verify_exp=False)
+        except PyJWTError:
+            # No session is ever registered with an invalid token
+            return
+
+        session_cache.invalidate(payload.get("sub"))
 
-    def is_session_active(self, email: str) -> bool:
+        # The stateless verification only rejects the token once it is revoked
+        if STATELESS_AUTH and payload.get("exp"):
+            revocation_list.revoke(token, payload.get("sub"), payload["exp"])
+
+
+    def is_session_active(self, email: str, token: str | None = None) -> bool:
         """
         This method is responsible for checking if the session is active.
 
         Args:
             email (str): The email.
+            token (str): The access token of the user, verified without the database in the stateless auth mode.
 
         Returns:
             bool: True if the session is active and False otherwise.
         """
 
-        return self.user_repository.is_session_active(email)
+        if STATELESS_AUTH and token is not None:
+            try:
+                return self.verify_token(token) == email
+            except HTTPException:
+                return False
+
+        # A session checked recently is trusted until the cache entry expires
+        if session_cache.is_active(email): return True
+
+        # The cached sessions never outlive their token, an ended or expired session is simply not cached again
+        expiry_time = self.user_repository.get_session_expiry(email)
+        if expiry_time is None:
+            return False
+
+        session_cache.set(email, expiry_time)
+        return True
@@ -0,0 +1,76 @@
+from services.ads_aggregator import AdsAggregator, extract_ads
+
+
+def tiktok_response(*ad_ids: str, has_more: bool = False) -> dict:
+    return {
+        "data": {"ads": [{"ad": {"id": ad_id}} for ad_id in ad_ids], "has_more": has_more},
+        "error": {"code": "ok"}
+    }
+
+
+def test_facebook_ads_are_merged_by_id_with_their_countries():
+    merged = AdsAggregator().merge("facebook", {
+        "FR": {"data": [{"id": "1"}, {"id": "2"}]},
+        "DE": {"data": [{"id": "2"}, {"id": "3"}]}
+    })
+
+    assert merged["data"] == [
+        {"id": "1", "reached_countries": ["FR"]},
+        {"id": "2", "reached_countries": ["FR", "DE"]},
+        {"id": "3", "reached_countries": ["DE"]}
+    ]
+    assert merged["errors"] == {}
+
+
+def test_tiktok_ads_are_merged_under_data_ads():
+    merged = AdsAggregator().merge("tiktok", {
+        "FR": tiktok_response("1", "2"),
+        "DE": tiktok_response("2", has_more=True)
+    })
+
+    assert [ad["reached_countries"] for ad in extract_ads("tiktok", merged)] == [["FR"], ["FR", "DE"]]
+    assert merged["data"]["has_more"]
+    assert merged["error"] == {"code": "ok"}
+
+
+def test_failed_countries_are_reported_without_their_ads():
+    merged = AdsAggregator().merge("tiktok", {
+        "FR": tiktok_response("1"),
+        "DE": {"error": {"code": "rate_limited"}}
+    })
+
+    assert [ad["ad"]["id"] for ad in merged["data"]["ads"]] == ["1"]
+    assert merged["errors"] == {"DE": {"code": "rate_limited"}}
+
+
+def test_merge_does_not_modify_the_cached_responses():
+    response = {"data": [{"id": "1"}]}
+
+    AdsAggregator().merge("facebook", {"FR": response, "DE": response})
+
+    assert response == {"data": [{"id": "1"}]}
+
+
+def test_sources_include_the_tiktok_ads_of_several_countries():
+    aggregator = AdsAggregator()
+    tiktok_responses = {"FR": tiktok_response("1", "2"), "DE": tiktok_response("2", "3")}
+
+    def search_tiktok() -> dict:
+        return aggregator.merge("tiktok", aggregator.fan_out(tiktok_responses.get, ["FR", "DE"]))
+
+    result = aggregator.search_sources({
+        "facebook": lambda: {"data": [{"id": "4", "page_name": "Shoes"}]},
+        "tiktok": search_tiktok
+    }, timeout=5)
+
+    tiktok_ads = [ad for ad in result["data"] if ad["platform"] == "tiktok"]
+    assert [ad["id"] for ad in tiktok_ads] == ["1", "2", "3"]
+    assert tiktok_ads[1]["reached_countries"] == ["FR", "DE"]
+    assert result["sources"]["tiktok"] == {"status": "ok", "count": 3}
+    assert result["sources"]["facebook"] == {"status": "ok", "count": 1}
+    assert result["timed_out"] == []
+
+
+def test_tiktok_ads_are_extracted_from_a_flat_data_list():
+    assert extract_ads("tiktok", {"data": [{"ad": {"id": "1"}}]}) == [{"ad": {"id": "1"}}]
+    assert extract_ads("tiktok", {"data": None}) == []
@@ -0,0 +1,33 @@
+from services.ads_index import AdsIndex
+
+
+def test_ads_are_searchable_by_search_term_and_advertiser():
+    index = AdsIndex()
+    index.add_response("facebook", {"data": [{"id": "1", "page_id": "10", "page_name": "Acme Shoes"}]}, "running")
+
+    assert [ad["id"] for ad in index.search("running")["data"]] == ["1"]
+    assert [ad["id"] for ad in index.search("acme", page_id="10")["data"]] == ["1"]
+    assert index.search("running", platform="tiktok")["data"] == []
+
+
+def test_creative_texts_are_only_searchable_when_requested():
+    index = AdsIndex()
+    index.add_response("facebook", {"data": [{"id": "1", "page_name": "Acme"}]}, "shoes")
+    index.add_response("facebook", {"data": [{"id": "2", "page_name": "Acme", "ad_creative_bodies": ["Waterproof boots"]}]}, "shoes")
+
+    assert [ad["id"] for ad in index.search("waterproof")["data"]] == ["2"]
+
+
+def test_reindexed_ad_keeps_the_terms_of_its_previous_searches():
+    index = AdsIndex()
+    index.add_response("facebook", {"data": [{"id": "1"}]}, "shoes")
+    index.add_response("facebook", {"data": [{"id": "1"}]}, "boots")
+
+    assert [ad["id"] for ad in index.search("shoes boots")["data"]] == ["1"]
+
+
+def test_least_recently_fetched_ads_are_evicted():
+    index = AdsIndex(max_ads=2)
+    index.add_response("tiktok", {"data": {"ads": [{"ad": {"id": ad_id}} for ad_id in ("1", "2", "3")]}}, "shoes")
+
+    assert sorted(ad["id"] for ad in index.search("shoes")["data"]) == ["2", "3"]
@@ -0,0 +1,85 @@
+import pytest
+
+from ads_apis.circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+def open_breaker(open_seconds: float = 0.0) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, open_seconds=open_seconds)
+
+    for _ in range(4):
+        breaker.allow()
+        breaker.record_failure()
+
+    return breaker
+
+
+def test_circuit_stays_closed_below_the_minimum_calls():
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4)
+
+    for _ in range(3):
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.allow()
+
+
+def test_circuit_stays_closed_below_the_failure_rate():
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4)
+
+    for _ in range(3):
+        breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_opens_on_the_failure_rate():
+    breaker = open_breaker(open_seconds=30)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+
+
+def test_half_open_circuit_lets_a_single_probe_through():
+    breaker = open_breaker()
+
+    breaker.allow()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+
+
+def test_released_probe_can_be_sent_by_another_caller():
+    breaker = open_breaker()
+
+    breaker.allow()
+    breaker.release()
+
+    breaker.allow()
+    assert breaker.probing
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = open_breaker()
+
+    breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.outcomes
+    breaker.allow()
+    breaker.allow()
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = open_breaker()
+
+    breaker.allow()
+    breaker.open_seconds = 30
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
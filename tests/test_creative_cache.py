@@ -0,0 +1,65 @@
+from services import api_service
+from services.api_service import ApiService
+from services.media_cache import CreativeCache
+
+
+class GraphAPI:
+    def __init__(self, creatives: dict) -> None:
+        self.creatives = creatives
+        self.lookups = []
+
+    def get_objects(self, object_ids: list[str], fields: str, timeout: float = 10.0) -> dict:
+        self.lookups.append((list(object_ids), timeout))
+        return {object_id: self.creatives.get(object_id, {"error": "timed out"}) for object_id in object_ids}
+
+
+def make_service(monkeypatch, creatives: dict) -> ApiService:
+    monkeypatch.setattr(api_service, "creative_cache", CreativeCache())
+    service = ApiService.__new__(ApiService)
+    service.facebook_ads_api = GraphAPI(creatives)
+    return service
+
+
+def test_creative_texts_are_looked_up_once(monkeypatch):
+    service = make_service(monkeypatch, {"1": {"id": "1", "ad_creative_bodies": ["Buy shoes"]}})
+
+    for _ in range(2):
+        assert service.resolve_creatives([{"id": "1"}]) == [{"id": "1", "ad_creative_bodies": ["Buy shoes"]}]
+
+    assert service.facebook_ads_api.lookups == [(["1"], api_service.CREATIVE_LOOKUP_TIMEOUT)]
+
+
+def test_ads_without_creative_texts_are_not_looked_up_again(monkeypatch):
+    service = make_service(monkeypatch, {"1": {"id": "1"}})
+
+    service.resolve_creatives([{"id": "1"}])
+
+    assert service.resolve_creatives([{"id": "1"}]) == [{"id": "1"}]
+    assert len(service.facebook_ads_api.lookups) == 1
+
+
+def test_failed_lookups_are_retried(monkeypatch):
+    service = make_service(monkeypatch, {})
+
+    assert service.resolve_creatives([{"id": "1"}]) == [{"id": "1"}]
+    service.facebook_ads_api.creatives["1"] = {"id": "1", "ad_creative_bodies": ["Buy shoes"]}
+
+    assert service.resolve_creatives([{"id": "1"}])[0]["ad_creative_bodies"] == ["Buy shoes"]
+
+
+def test_expired_creative_texts_are_dropped():
+    cache = CreativeCache(ttl=0)
+
+    cache.set("1", {"ad_creative_bodies": ["Buy shoes"]})
+
+    assert cache.get_many(["1"]) == {}
+    assert not cache.entries
+
+
+def test_least_recently_used_creative_texts_are_evicted():
+    cache = CreativeCache(max_entries=2)
+
+    for ad_id in ("1", "2", "3"):
+        cache.set(ad_id, {})
+
+    assert list(cache.get_many(["1", "2", "3"])) == ["2", "3"]
@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from services.creative_dedup import CreativeDeduplicator, dedup_response
+from services.media_cache import MediaCache
+
+FB_ADS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fb_ads.json")
+
+# The page of fb_ads.json running the same creative under several ad ids
+PAGE_ID = "106196845908636"
+
+
+def load_response() -> dict:
+    with open(FB_ADS_PATH) as file:
+        return json.load(file)
+
+
+def signed_url(path: str, signature: str) -> str:
+    # Each fetch of a snapshot page signs the same file with a new signature
+    expiry = format(int(time.time()) + 86400, "X")
+    return f"https://video.xx.fbcdn.net{path}?_nc_ohc={signature}&oh={signature}&oe={expiry}"
+
+
+def test_ads_without_media_nor_text_are_not_merged():
+    response = load_response()
+
+    deduplicated = dedup_response("facebook", response, media_cache=MediaCache())
+
+    assert len(deduplicated["data"]) == len(response["data"])
+
+
+def test_ads_sharing_a_resolved_video_are_folded():
+    response = load_response()
+    page_ads = [ad for ad in response["data"] if ad["page_id"] == PAGE_ID]
+    cache = MediaCache()
+
+    for ad in page_ads:
+        cache.set(ad["id"], {"video_sd_url": signed_url("/v/t42.1790-2/creative_n.mp4", ad["id"]), "video_hd_url": None, "image_urls": []})
+
+    deduplicated = dedup_response("facebook", response, media_cache=cache)
+
+    assert len(deduplicated["data"]) == len(response["data"]) - len(page_ads) + 1
+
+    group = next(ad for ad in deduplicated["data"] if ad["page_id"] == PAGE_ID)
+    assert group["id"] == page_ads[0]["id"]
+    assert group["creative_count"] == len(page_ads)
+    assert group["creative_ids"] == [ad["id"] for ad in page_ads]
+
+    # The response is shared with the cache, it is left untouched
+    assert "creative_count" not in response["data"][0]
+
+
+def test_ads_sharing_a_creative_text_are_folded():
+    response = load_response()
+    ads = [dict(ad, ad_creative_bodies=["Free shipping today"]) if ad["page_id"] == PAGE_ID else ad for ad in response["data"]]
+
+    deduplicated = dedup_response("facebook", dict(response, data=ads), media_cache=MediaCache())
+
+    assert sum(1 for ad in deduplicated["data"] if ad["page_id"] == PAGE_ID) == 1
+
+
+def test_listed_ids_are_capped():
+    deduplicator = CreativeDeduplicator("facebook", max_ids=3, media_cache=MediaCache())
+    ads = [{"id": str(index), "page_id": PAGE_ID, "video_url": signed_url("/v/creative_n.mp4", str(index))} for index in range(10)]
+
+    groups = [deduplicator.add(ad) for ad in ads]
+
+    assert groups[1:] == [None] * 9
+    assert groups[0]["count"] == 10
+    assert groups[0]["ids"] == ["0", "1", "2"]
@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+from services.password_hasher import PasswordHasher, PasswordHasherBusy, get_rounds
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(max_workers=1, max_queue=1, rounds=4, timeout=10)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_password_is_verified_against_its_hash(hasher):
+    hashed_password = hasher.hash("correct horse")
+
+    assert get_rounds(hashed_password) == 4
+    assert hasher.verify("correct horse", hashed_password) == (True, None)
+    assert hasher.verify("wrong horse", hashed_password) == (False, None)
+
+
+def test_hash_with_another_cost_factor_is_replaced(hasher):
+    hashed_password = hasher.hash("correct horse")
+    hasher.rounds = 5
+
+    is_correct, new_hash = hasher.verify("correct horse", hashed_password)
+
+    assert is_correct
+    assert get_rounds(new_hash) == 5
+
+
+def test_passwords_beyond_the_queue_are_refused(hasher):
+    while hasher.slots.acquire(blocking=False):
+        pass
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash("correct horse")
+
+
+def test_slow_password_is_given_up_and_its_slot_released(hasher):
+    hasher.timeout = 0.1
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.submit(time.sleep, 1)
+
+    time.sleep(1.5)
+    assert hasher.slots.acquire(blocking=False) and hasher.slots.acquire(blocking=False)
+
+
+def test_pool_is_replaced_after_a_worker_died(hasher):
+    with pytest.raises(PasswordHasherBusy):
+        hasher.submit(os._exit, 1)
+
+    assert get_rounds(hasher.hash("correct horse")) == 4
@@ -0,0 +1,95 @@
+import json
+import time
+
+import pytest
+import requests
+
+from ads_apis.rate_limiter import RateLimiter, RateLimitExceeded
+
+
+def make_response(status_code: int = 200, headers: dict | None = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def test_burst_is_served_without_waiting():
+    limiter = RateLimiter("test", rate=1, burst=5, max_wait=0)
+
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+
+    assert time.monotonic() - started < 0.1
+
+
+def test_caller_waits_for_the_next_token():
+    limiter = RateLimiter("test", rate=20, burst=1, max_wait=1)
+
+    limiter.acquire()
+    started = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - started >= 0.04
+
+
+def test_caller_is_refused_beyond_the_maximum_wait():
+    limiter = RateLimiter("test", rate=1, burst=1, max_wait=0.5)
+
+    limiter.acquire()
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+
+    # The refused caller gives its token back
+    assert limiter.tokens == pytest.approx(0, abs=0.1)
+
+
+def test_retry_after_blocks_the_callers():
+    limiter = RateLimiter("test", rate=10, burst=10, max_wait=2)
+
+    limiter.observe(make_response(429, {"Retry-After": "30"}))
+
+    assert limiter.stats()["blocked_for"] == pytest.approx(30, abs=1)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+
+
+def test_throttled_responses_of_one_block_halve_the_rate_once():
+    limiter = RateLimiter("test", rate=8, min_rate=1)
+
+    for _ in range(3):
+        limiter.observe(make_response(429, {"Retry-After": "5"}))
+
+    assert limiter.rate == 4
+
+
+def test_rate_follows_the_reported_usage():
+    limiter = RateLimiter("test", rate=10, min_rate=1)
+
+    limiter.observe(make_response(headers={"X-App-Usage": json.dumps({"call_count": 75, "total_time": 10})}))
+    assert limiter.rate == 5
+
+    # Speeding up is gradual
+    limiter.observe(make_response(headers={"X-App-Usage": json.dumps({"call_count": 10})}))
+    assert limiter.rate == 6
+    assert not limiter.has_headroom(max_usage=5)
+
+
+def test_business_usage_sets_the_time_to_regain_access():
+    limiter = RateLimiter("test")
+    usage = {"123": [{"call_count": 100, "estimated_time_to_regain_access": 2}]}
+
+    limiter.observe(make_response(headers={"X-Business-Use-Case-Usage": json.dumps(usage)}))
+
+    assert limiter.stats()["blocked_for"] == pytest.approx(120, abs=1)
+    assert limiter.rate == limiter.min_rate
+
+
+def test_malformed_usage_headers_are_ignored():
+    limiter = RateLimiter("test", rate=10)
+
+    limiter.observe(make_response(headers={"X-App-Usage": "not json"}))
+
+    assert limiter.rate == 10
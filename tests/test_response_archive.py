@@ -0,0 +1,38 @@
+import gzip
+import json
+import os
+
+from ads_apis.response_archive import ResponseArchive
+
+
+def test_close_writes_the_queued_records_and_completes_the_segment(tmp_path):
+    archive = ResponseArchive(str(tmp_path), enabled=True)
+
+    for i in range(100):
+        assert archive.submit("facebook", {"data": [i]})
+
+    archive.close()
+
+    [segment] = os.listdir(tmp_path)
+    with gzip.open(tmp_path / segment, "rb") as file:
+        records = [json.loads(line) for line in file]
+
+    assert [record["response"]["data"][0] for record in records] == list(range(100))
+    assert not archive.writer.is_alive()
+
+
+def test_closed_archive_refuses_new_records(tmp_path):
+    archive = ResponseArchive(str(tmp_path), enabled=True)
+    archive.close()
+
+    assert not archive.submit("tiktok", {"data": {"ads": []}})
+    assert os.listdir(tmp_path) == []
+
+
+def test_disabled_archive_closes_without_writing(tmp_path):
+    archive = ResponseArchive(str(tmp_path / "archive"))
+
+    assert not archive.submit("facebook", {"data": []})
+    archive.close()
+
+    assert not os.path.exists(tmp_path / "archive")
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from services.result_cache import ResultCache
+
+
+class Upstream:
+    def __init__(self, responses: list) -> None:
+        self.responses = responses
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        response = self.responses.pop(0)
+        self.called.set()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_fresh_result_is_served_from_the_cache():
+    cache = ResultCache(ttls={"facebook": 300})
+    upstream = Upstream([{"data": [1]}])
+
+    assert cache.get_or_load("facebook", ("shoes", "FR"), upstream) == {"data": [1]}
+    assert cache.get_or_load("facebook", ("shoes", "FR"), upstream) == {"data": [1]}
+    assert upstream.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_result_is_served_while_it_is_refreshed():
+    cache = ResultCache(ttls={"facebook": 0}, stale_ttl=600)
+    upstream = Upstream([{"data": [1]}, {"data": [2]}])
+
+    cache.get_or_load("facebook", ("shoes", "FR"), upstream)
+    upstream.called.clear()
+
+    assert cache.get_or_load("facebook", ("shoes", "FR"), upstream) == {"data": [1]}
+    assert upstream.called.wait(1)
+    cache.executor.shutdown(wait=True)
+
+    assert cache.entries[("facebook", "shoes", "FR")][1] == {"data": [2]}
+    assert cache.stats()["stale_hits"] == 1
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_failed_revalidation_keeps_the_stale_result():
+    cache = ResultCache(ttls={"facebook": 0}, stale_ttl=600)
+    upstream = Upstream([{"data": [1]}, RuntimeError("upstream down")])
+
+    cache.get_or_load("facebook", ("shoes", "FR"), upstream)
+    cache.get_or_load("facebook", ("shoes", "FR"), upstream)
+    cache.executor.shutdown(wait=True)
+
+    assert cache.entries[("facebook", "shoes", "FR")][1] == {"data": [1]}
+    assert cache.stats()["revalidations"] == 0
+
+
+def test_expired_result_is_the_fallback_when_upstream_fails():
+    cache = ResultCache(ttls={"tiktok": 0}, stale_ttl=0)
+    upstream = Upstream([{"data": [1], "error": {"code": "ok"}}, {"error": {"code": "rate_limited"}}])
+
+    cache.get_or_load("tiktok", ("shoes", "FR"), upstream)
+
+    assert cache.get_or_load("tiktok", ("shoes", "FR"), upstream) == {"data": [1], "error": {"code": "ok"}}
+    assert cache.stats()["fallbacks"] == 1
+
+
+def test_upstream_error_without_a_cached_result_is_raised():
+    cache = ResultCache()
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("facebook", ("shoes", "FR"), Upstream([RuntimeError("upstream down")]))
+
+
+def test_least_recently_used_result_is_evicted():
+    cache = ResultCache(max_entries=2)
+
+    for country in ("FR", "DE", "IT"):
+        cache.get_or_load("facebook", ("shoes", country), Upstream([{"data": [country]}]))
+
+    assert ("facebook", "shoes", "FR") not in cache.entries
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,77 @@
+import datetime as dt
+import time
+
+from services.revocation_list import BloomFilter, RevocationList, get_token_id
+
+
+class RevokedTokens:
+    def __init__(self) -> None:
+        self.revocations = []
+        self.since = []
+
+    def revoke(self, token_id: str, email: str, expiry_time: dt.datetime) -> None:
+        self.revocations.append({
+            "token_id": token_id,
+            "expiry_time": expiry_time.replace(tzinfo=None),
+            "revoked_at": dt.datetime.now(dt.UTC).replace(tzinfo=None)
+        })
+
+    def find_revoked(self, revoked_since: dt.datetime | None) -> list[dict]:
+        self.since.append(revoked_since)
+        return [revocation for revocation in self.revocations if revoked_since is None or revocation["revoked_at"] >= revoked_since]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(1000)
+    token_ids = [get_token_id(f"token-{i}") for i in range(1000)]
+
+    for token_id in token_ids:
+        bloom_filter.add(token_id)
+
+    assert all(token_id in bloom_filter for token_id in token_ids)
+
+
+def test_bloom_filter_false_positive_rate_holds_at_capacity():
+    bloom_filter = BloomFilter(1000, error_rate=0.01)
+
+    for i in range(1000):
+        bloom_filter.add(get_token_id(f"token-{i}"))
+
+    false_positives = sum(get_token_id(f"other-{i}") in bloom_filter for i in range(10000))
+    assert false_positives < 300
+
+
+def test_revoked_token_is_rejected_and_stored():
+    revocation_list = RevocationList()
+    repository = RevokedTokens()
+
+    revocation_list.revoke("token", "user@example.com", time.time() + 3600, repository)
+
+    assert revocation_list.is_revoked("token")
+    assert not revocation_list.is_revoked("other-token")
+    assert repository.revocations[0]["token_id"] == get_token_id("token")
+
+
+def test_revocations_of_the_other_workers_are_loaded():
+    repository = RevokedTokens()
+    RevocationList().revoke("token", "user@example.com", time.time() + 3600, repository)
+    revocation_list = RevocationList()
+
+    assert revocation_list.load(repository) == 1
+    assert revocation_list.is_revoked("token")
+
+    # The next poll only reads the revocations made since, with a margin
+    revocation_list.load(repository)
+    assert repository.since[-1] < repository.revocations[0]["revoked_at"]
+
+
+def test_full_filter_is_rebuilt_without_the_expired_revocations():
+    revocation_list = RevocationList(capacity=2)
+
+    revocation_list.add(get_token_id("expired"), time.time() - 1)
+    revocation_list.add(get_token_id("first"), time.time() + 3600)
+    revocation_list.add(get_token_id("second"), time.time() + 3600)
+
+    assert not revocation_list.is_revoked("expired")
+    assert revocation_list.is_revoked("first") and revocation_list.is_revoked("second")
+    assert revocation_list.filter.count == 2
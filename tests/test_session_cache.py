@@ -0,0 +1,81 @@
+import datetime as dt
+import time
+
+from DTOs.user import LoginSchema
+from services import user_service
+from services.session_cache import SessionCache
+from services.user_service import UserService
+
+
+class Session:
+    def __init__(self, email: str) -> None:
+        self.email = email
+        self.expiry_time = dt.datetime.now(dt.UTC) + dt.timedelta(hours=1)
+
+
+class Users:
+    def __init__(self, active_token: str | None = None) -> None:
+        self.active_token = active_token
+
+    def get_access_token_from_active_session(self, email: str) -> str | None:
+        return self.active_token
+
+    def get_access_token(self, form_data: LoginSchema) -> str:
+        return "new-token"
+
+    def register_token_in_session(self, token: str) -> Session:
+        self.active_token = token
+        return Session("user@example.com")
+
+
+def make_service(monkeypatch, users: Users) -> UserService:
+    cache = SessionCache()
+    monkeypatch.setattr(user_service, "session_cache", cache)
+    service = UserService.__new__(UserService)
+    service.user_repository = users
+    monkeypatch.setattr(service, "is_password_correct", lambda form_data: True)
+    return service
+
+
+def login_form() -> LoginSchema:
+    return LoginSchema(email="user@example.com", password="password")
+
+
+def test_login_issues_a_new_token_when_the_cached_session_ended(monkeypatch):
+    service = make_service(monkeypatch, Users())
+    user_service.session_cache.set("user@example.com", time.time() + 3600)
+
+    assert service.get_access_token(login_form())["access_token"] == "new-token"
+
+
+def test_login_returns_the_token_of_the_active_session(monkeypatch):
+    service = make_service(monkeypatch, Users(active_token="active-token"))
+
+    assert service.get_access_token(login_form())["access_token"] == "active-token"
+
+
+def test_cached_session_never_outlives_its_token():
+    cache = SessionCache(ttl=30)
+
+    cache.set("user@example.com", time.time() - 1)
+
+    assert not cache.is_active("user@example.com")
+
+
+def test_invalidated_session_is_checked_again():
+    cache = SessionCache()
+
+    cache.set("user@example.com", time.time() + 3600)
+    cache.invalidate("user@example.com")
+
+    assert not cache.is_active("user@example.com")
+
+
+def test_least_recently_used_session_is_evicted():
+    cache = SessionCache(max_entries=1)
+
+    cache.set("first@example.com", time.time() + 3600)
+    cache.set("second@example.com", time.time() + 3600)
+
+    assert not cache.is_active("first@example.com")
+    assert cache.is_active("second@example.com")
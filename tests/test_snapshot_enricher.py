@@ -0,0 +1,65 @@
+import time
+
+from services.media_cache import MediaCache
+from services.snapshot_enricher import SnapshotEnricher
+
+PAGE = b'"video_sd_url":"https:\\/\\/video.xx.fbcdn.net\\/v\\/creative_n.mp4"'
+
+
+class SlowResponse:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int):
+        time.sleep(self.delay)
+        yield PAGE
+
+
+class SlowClient:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    def get(self, url: str, **kwargs) -> SlowResponse:
+        return SlowResponse(self.delay)
+
+
+def make_ads(count: int) -> list[dict]:
+    return [{"id": str(index), "ad_snapshot_url": f"https://www.facebook.com/ads/archive/render_ad/?id={index}"} for index in range(count)]
+
+
+def test_queued_fetches_get_their_own_timeout():
+    enricher = SnapshotEnricher(max_workers=2, timeout=0.5, request_timeout=2.0, http_client=SlowClient(0.2), media_cache=MediaCache())
+    ads = make_ads(6)
+
+    enricher.enrich(ads)
+
+    assert [ad["video_url"] for ad in ads] == ["https://video.xx.fbcdn.net/v/creative_n.mp4"] * 6
+
+
+def test_fetches_not_started_by_the_request_deadline_are_given_up():
+    enricher = SnapshotEnricher(max_workers=2, timeout=0.5, request_timeout=0.3, http_client=SlowClient(0.2), media_cache=MediaCache())
+    ads = make_ads(8)
+
+    started_at = time.monotonic()
+    enricher.enrich(ads)
+
+    # The first two rounds start before the deadline, the others are returned without their video
+    assert time.monotonic() - started_at < 0.8
+    assert [ad["video_url"] is not None for ad in ads] == [True] * 4 + [False] * 4
+
+
+def test_cached_media_needs_no_fetch():
+    cache = MediaCache()
+    cache.set("0", {"video_sd_url": "https://video.xx.fbcdn.net/v/cached_n.mp4", "video_hd_url": None, "image_urls": []})
+    enricher = SnapshotEnricher(max_workers=1, timeout=0.1, request_timeout=0.1, http_client=SlowClient(1.0), media_cache=cache)
+    ads = make_ads(1)
+
+    enricher.enrich(ads)
+
+    assert ads[0]["video_url"] == "https://video.xx.fbcdn.net/v/cached_n.mp4"
@@ -0,0 +1,64 @@
+from ads_apis.snapshot_parser import MAX_VALUE_LENGTH, SnapshotParser, parse_snapshot
+
+PAGE = (
+    b'<html><script>{"original_image_url":"https:\\/\\/scontent.xx.fbcdn.net\\/v\\/image_n.jpg",'
+    b'"video_hd_url":"https:\\/\\/video.xx.fbcdn.net\\/v\\/hd_n.mp4?a=1\\u0026b=2",'
+    b'"video_sd_url":"https:\\/\\/video.xx.fbcdn.net\\/v\\/sd_n.mp4"}</script>'
+)
+
+EXPECTED = {
+    "video_sd_url": "https://video.xx.fbcdn.net/v/sd_n.mp4",
+    "video_hd_url": "https://video.xx.fbcdn.net/v/hd_n.mp4?a=1&b=2",
+    "image_urls": ["https://scontent.xx.fbcdn.net/v/image_n.jpg"]
+}
+
+
+def split(page: bytes, size: int) -> list[bytes]:
+    return [page[index:index + size] for index in range(0, len(page), size)]
+
+
+def test_whole_page():
+    assert parse_snapshot([PAGE]) == EXPECTED
+
+
+def test_keys_and_values_split_across_chunks():
+    # Every chunk size cuts the keys and the urls at a different place
+    for size in range(1, 64):
+        assert parse_snapshot(split(PAGE, size)) == EXPECTED, size
+
+
+def test_stops_once_the_sd_url_is_found():
+    chunks = split(b'"video_sd_url":"https:\\/\\/video.xx.fbcdn.net\\/v\\/sd_n.mp4"' + b"x" * 4096, 64)
+    read = []
+
+    def tracked():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    media = parse_snapshot(tracked())
+
+    assert media["video_sd_url"] == "https://video.xx.fbcdn.net/v/sd_n.mp4"
+    assert media["video_hd_url"] is None
+    assert len(read) < len(chunks)
+
+
+def test_stop_keys_can_be_chosen():
+    media = parse_snapshot(split(PAGE, 16), stop_keys=("video_sd_url", "video_hd_url"))
+
+    assert media == EXPECTED
+
+
+def test_malformed_escape_is_skipped():
+    media = parse_snapshot([b'"video_sd_url":"bad\\x","video_sd_url":"https:\\/\\/video.xx.fbcdn.net\\/v\\/sd_n.mp4"'])
+
+    assert media["video_sd_url"] == "https://video.xx.fbcdn.net/v/sd_n.mp4"
+
+
+def test_overlong_value_is_dropped():
+    parser = SnapshotParser()
+
+    parser.feed(b'"video_sd_url":"' + b"x" * (MAX_VALUE_LENGTH + 1))
+
+    assert len(parser.buffer) < MAX_VALUE_LENGTH
+    assert parser.media["video_sd_url"] is None
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from ads_apis.token_cache import TokenCache
+
+
+class TokenEndpoint:
+    def __init__(self, expires_in: float = 7200, delay: float = 0.0) -> None:
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self) -> dict:
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+
+def test_token_is_reused_until_it_expires():
+    cache = TokenCache(expiry_margin=60, refresh_ahead=300)
+    endpoint = TokenEndpoint()
+
+    assert cache.get(endpoint)["access_token"] == "token-1"
+    assert cache.get(endpoint)["access_token"] == "token-1"
+    assert endpoint.calls == 1
+
+
+def test_token_within_the_expiry_margin_is_fetched_again():
+    cache = TokenCache(expiry_margin=60, refresh_ahead=60)
+    endpoint = TokenEndpoint(expires_in=30)
+
+    cache.get(endpoint)
+
+    assert cache.get(endpoint)["access_token"] == "token-2"
+
+
+def test_errors_are_not_cached():
+    cache = TokenCache()
+    responses = [{"error": "invalid_client"}, {"access_token": "token", "expires_in": 7200}]
+
+    assert cache.get(lambda: responses.pop(0)) == {"error": "invalid_client"}
+    assert cache.get(lambda: responses.pop(0))["access_token"] == "token"
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = TokenCache()
+    endpoint = TokenEndpoint(delay=0.1)
+    threads = [threading.Thread(target=cache.get, args=(endpoint,)) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert endpoint.calls == 1
+
+
+def test_token_close_to_expiry_is_refreshed_in_the_background():
+    cache = TokenCache(expiry_margin=60, refresh_ahead=300)
+    endpoint = TokenEndpoint(expires_in=200)
+
+    cache.get(endpoint)
+
+    # The current token is still served while the new one is fetched
+    assert cache.get(endpoint)["access_token"] == "token-1"
+
+    deadline = time.monotonic() + 1
+    while endpoint.calls < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert endpoint.calls == 2